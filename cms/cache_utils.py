@@ -0,0 +1,70 @@
+"""
+Cross-worker cache versioning helpers
+
+Every gunicorn/Passenger worker keeps its own in-memory copy of hot data.
+A version stamp file shared through the filesystem tells each worker when
+its copy is stale, so a save in one worker invalidates all the others.
+"""
+import copy
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+
+def _stamp_path(name):
+    return Path(settings.CACHE_VERSION_DIR) / name
+
+
+def get_version(name):
+    """
+    Return the current version stamp for ``name``.
+    A single stat() call - no database access.
+    """
+    try:
+        stat = os.stat(_stamp_path(name))
+    except FileNotFoundError:
+        return None
+    # A new inode is created on every bump, so the pair changes even when
+    # two bumps land within the filesystem's timestamp resolution.
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def bump_version(name):
+    """Invalidate every worker's copy of ``name``"""
+    directory = Path(settings.CACHE_VERSION_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}-')
+    os.close(fd)
+    os.replace(tmp_path, directory / name)
+
+
+def bump_version_on_commit(name):
+    """Bump the stamp once the current transaction (if any) has committed"""
+    transaction.on_commit(lambda: bump_version(name))
+
+
+# Per-worker singleton cache: {stamp name: (version, instance)}
+_singletons = {}
+
+
+def singleton_stamp(model):
+    return f'singleton-{model._meta.label_lower}'
+
+
+def load_singleton(model):
+    """
+    Load the pk=1 row of a singleton model, served from memory while the
+    model's version stamp is unchanged.
+    A copy is returned so callers can modify it without touching the cache.
+    """
+    name = singleton_stamp(model)
+    version = get_version(name)
+    cached = _singletons.get(name)
+    if cached is None or cached[0] != version:
+        obj, created = model.objects.get_or_create(pk=1)
+        cached = (version, obj)
+        _singletons[name] = cached
+    return copy.copy(cached[1])
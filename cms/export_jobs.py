@@ -0,0 +1,174 @@
+"""
+Background export jobs
+
+Large exports are recorded as ExportJob rows and written on a background
+thread once the request that created them commits, so the CMS returns at
+once and shows the job's progress while it runs. Files are gzip-compressed
+CSV or XLSX (openpyxl) written in constant memory, and stay under
+EXPORT_ROOT until ``run_export_jobs --purge`` removes jobs older than
+EXPORT_RETENTION_DAYS.
+
+Jobs left pending by a restarted worker, or left running past
+``RUNNING_LEASE`` by one that died, are run by ``run_export_jobs``.
+"""
+import csv
+import glob
+import gzip
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import CHUNK_SIZE, EXPORTS, export_rows
+from .models import ExportJob
+
+try:
+    import openpyxl
+except ImportError:  # In requirements.txt; without it only CSV is offered
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'csv': 'csv.gz', 'xlsx': 'xlsx'}
+
+# A job left "running" this long belongs to a worker that died
+RUNNING_LEASE = timedelta(hours=1)
+
+TMP_PREFIX = '.tmp-'
+
+
+def available_formats():
+    return [(value, label) for value, label in ExportJob.FORMAT_CHOICES if value != 'xlsx' or openpyxl]
+
+
+def job_queryset(job):
+    export = EXPORTS[job.kind]
+    queryset = export.filter(job.filters)
+    if job.date_from:
+        queryset = queryset.filter(**{f'{export.date_field}__date__gte': job.date_from})
+    if job.date_to:
+        queryset = queryset.filter(**{f'{export.date_field}__date__lte': job.date_to})
+    return queryset
+
+
+def _write_csv(f, header, rows):
+    with gzip.GzipFile(fileobj=f, mode='wb') as compressed:
+        text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            yield
+        text.flush()
+        text.detach()
+
+
+def _write_xlsx(f, header, rows):
+    # Write-only workbooks stream rows to a temporary file instead of memory
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+        yield
+    workbook.save(f)
+
+
+WRITERS = {'csv': _write_csv, 'xlsx': _write_xlsx}
+
+
+def run_export_job(pk):
+    """Write the file of a pending export job. Returns the resulting status, or None if already claimed."""
+    started_at = timezone.now()
+    claimed = ExportJob.objects.filter(pk=pk, status=ExportJob.STATUS_PENDING).update(
+        status=ExportJob.STATUS_RUNNING, started_at=started_at
+    )
+    if not claimed:
+        return None
+    # Only this run may finish the job, not one it was reclaimed from
+    this_run = ExportJob.objects.filter(pk=pk, started_at=started_at)
+
+    job = ExportJob.objects.get(pk=pk)
+    export = EXPORTS[job.kind]
+    storage = job.file.storage
+    os.makedirs(storage.location, exist_ok=True)
+    name = f"{export.name}_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}_{job.pk}.{EXTENSIONS[job.format]}"
+    fd, tmp_path = tempfile.mkstemp(dir=storage.location, prefix=TMP_PREFIX)
+    try:
+        queryset = job_queryset(job)
+        job.total_rows = queryset.count()
+        ExportJob.objects.filter(pk=pk).update(total_rows=job.total_rows)
+
+        rows = export_rows(queryset, export.row)
+        with os.fdopen(fd, 'wb') as f:
+            for written, _ in enumerate(WRITERS[job.format](f, export.header, rows), 1):
+                if written % CHUNK_SIZE == 0:
+                    ExportJob.objects.filter(pk=pk).update(processed_rows=written)
+        os.replace(tmp_path, storage.path(name))
+    except Exception as e:
+        logger.exception('Export job %s failed', pk)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = ExportJob.STATUS_FAILED
+        this_run.update(status=job.status, error=str(e), finished_at=timezone.now())
+    else:
+        job.status = ExportJob.STATUS_DONE
+        if not this_run.update(
+            status=job.status, file=name, processed_rows=job.total_rows, finished_at=timezone.now()
+        ):
+            # Reclaimed meanwhile: the run that claimed it again writes the file
+            os.remove(storage.path(name))
+    return job.status
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export-jobs')
+
+
+def _run_in_background(pk):
+    close_old_connections()
+    try:
+        run_export_job(pk)
+    except Exception:
+        logger.exception('Export job %s failed', pk)
+    finally:
+        connection.close()
+
+
+def schedule_export_job(pk):
+    """Run an export job on the background thread once the transaction commits"""
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, pk))
+
+
+def reclaim_stale_jobs():
+    """Return jobs that outlived the lease to pending and remove their partial files. Returns their number."""
+    cutoff = timezone.now() - RUNNING_LEASE
+    # No claim time: claimed before started_at was recorded
+    reclaimed = ExportJob.objects.filter(
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True), status=ExportJob.STATUS_RUNNING,
+    ).update(status=ExportJob.STATUS_PENDING, processed_rows=0)
+
+    location = ExportJob._meta.get_field('file').storage.location
+    for path in glob.glob(os.path.join(glob.escape(location), TMP_PREFIX + '*')):
+        try:
+            if os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+    return reclaimed
+
+
+def purge_old_jobs(days=None):
+    """Delete jobs, and their files, older than ``days`` (default: EXPORT_RETENTION_DAYS)"""
+    days = settings.EXPORT_RETENTION_DAYS if days is None else days
+    old = ExportJob.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+    for job in old:
+        if job.file:
+            job.file.delete(save=False)
+    return old.delete()[0]
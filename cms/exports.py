@@ -0,0 +1,271 @@
+"""
+CSV exports of inquiries
+
+Each export is a header row plus a function turning one object into a
+row. Rows are read from a single query in chunks (reply counts are
+columns of the inquiries, see inquiries.signals) and written to the
+response as they are produced, so the memory used does not grow with the
+number of inquiries.
+
+``EXPORTS`` lists every export, for the background export jobs
+(see cms/export_jobs.py).
+"""
+import csv
+from collections import namedtuple
+
+from django.db.models import F, Q
+
+from inquiries.models import ContactMessage, Inquiry, InquiryReply, QuoteRequest
+
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+# Orderings offered by the CMS lists of contact messages and quote requests
+SORT_CHOICES = [
+    ('', 'Newest first'),
+    ('oldest', 'Oldest first'),
+    ('unanswered', 'Unanswered first'),
+    ('last_reply', 'Recently replied'),
+    ('most_replies', 'Most replies'),
+]
+
+SORT_ORDERINGS = {
+    '': ['-created_at', '-id'],
+    'oldest': ['created_at', 'id'],
+    'unanswered': ['reply_count', '-created_at', '-id'],
+    'last_reply': [F('last_replied_at').desc(nulls_last=True), '-created_at', '-id'],
+    'most_replies': ['-reply_count', '-created_at', '-id'],
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Yield the lines of a CSV file, one per row"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def filter_replied(queryset, params):
+    """Apply the response-state filter and ordering shared by inquiry lists"""
+    replied = params.get('replied', '')
+    if replied == 'yes':
+        queryset = queryset.filter(reply_count__gt=0)
+    elif replied == 'no':
+        queryset = queryset.filter(reply_count=0)
+
+    return queryset.order_by(*SORT_ORDERINGS.get(params.get('sort', ''), SORT_ORDERINGS['']))
+
+
+def filter_contact_messages(params):
+    """Contact messages matching the filters of the CMS list"""
+    queryset = ContactMessage.objects.all()
+
+    search_query = params.get('search', '')
+    if search_query:
+        queryset = queryset.filter(
+            Q(name__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(business_name__icontains=search_query)
+        )
+
+    status = params.get('status', '')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    subject = params.get('subject', '')
+    if subject:
+        queryset = queryset.filter(subject=subject)
+
+    is_read = params.get('is_read', '')
+    if is_read == 'yes':
+        queryset = queryset.filter(is_read=True)
+    elif is_read == 'no':
+        queryset = queryset.filter(is_read=False)
+
+    return filter_replied(queryset, params)
+
+
+def filter_quote_requests(params):
+    """Quote requests matching the filters of the CMS list"""
+    queryset = QuoteRequest.objects.all()
+
+    search_query = params.get('search', '')
+    if search_query:
+        queryset = queryset.filter(
+            Q(name__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(business_name__icontains=search_query) |
+            Q(reference_id__icontains=search_query)
+        )
+
+    status = params.get('status', '')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    business_type = params.get('business_type', '')
+    if business_type:
+        queryset = queryset.filter(business_type=business_type)
+
+    return filter_replied(queryset, params)
+
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+CONTACT_MESSAGE_HEADER = [
+    'ID', 'Date', 'Name', 'Email', 'Phone', 'Business Name',
+    'Subject', 'Message', 'Status', 'Is Read', 'Reply Count', 'First Response', 'Last Reply'
+]
+
+
+def contact_message_row(msg):
+    return [
+        msg.id,
+        msg.created_at.strftime('%Y-%m-%d %H:%M'),
+        msg.name,
+        msg.email,
+        msg.phone or '',
+        msg.business_name or '',
+        msg.get_subject_display(),
+        msg.message,
+        msg.get_status_display(),
+        'Yes' if msg.is_read else 'No',
+        msg.reply_count,
+        _format_date(msg.first_response_at),
+        _format_date(msg.last_replied_at),
+    ]
+
+
+QUOTE_REQUEST_HEADER = [
+    'Reference ID', 'Date', 'Name', 'Email', 'Phone', 'Business Name', 'Business Type',
+    'Product Type', 'Quantity', 'Budget Range', 'Custom Branding', 'Sample Order',
+    'Delivery State', 'Delivery City', 'Order Frequency', 'Status',
+    'Reply Count', 'First Response', 'Last Reply'
+]
+
+
+def quote_request_row(quote):
+    quantities = [quote.tissue_quantity, quote.dhoop_quantity]
+    return [
+        quote.reference_id,
+        quote.created_at.strftime('%Y-%m-%d %H:%M'),
+        quote.name,
+        quote.email,
+        quote.phone or '',
+        quote.business_name,
+        quote.get_business_type_display(),
+        quote.product_interests or '',
+        '; '.join(q for q in quantities if q),
+        quote.budget_range or '',
+        'Yes' if quote.custom_branding_required else 'No',
+        'Yes' if quote.sample_order_first else 'No',
+        quote.delivery_state or '',
+        quote.delivery_city or '',
+        quote.get_order_frequency_display() or '',
+        quote.get_status_display(),
+        quote.reply_count,
+        _format_date(quote.first_response_at),
+        _format_date(quote.last_replied_at),
+    ]
+
+
+def filter_inquiries(params):
+    queryset = Inquiry.objects.select_related('product')
+    status = params.get('status', '')
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('-created_at')
+
+
+INQUIRY_HEADER = [
+    'ID', 'Date', 'Product', 'Name', 'Business Name', 'Email', 'Phone', 'WhatsApp',
+    'Quantity', 'Variant', 'Fragrance', 'Custom Branding', 'Delivery Location', 'Status'
+]
+
+
+def inquiry_row(inquiry):
+    return [
+        inquiry.id,
+        inquiry.created_at.strftime('%Y-%m-%d %H:%M'),
+        inquiry.product.name if inquiry.product else '',
+        inquiry.name,
+        inquiry.business_name,
+        inquiry.email,
+        inquiry.phone,
+        inquiry.whatsapp_number,
+        inquiry.quantity_needed,
+        inquiry.preferred_variant,
+        inquiry.fragrance_preference,
+        'Yes' if inquiry.custom_branding_required else 'No',
+        inquiry.delivery_location,
+        inquiry.get_status_display(),
+    ]
+
+
+def filter_inquiry_replies(params):
+    queryset = InquiryReply.objects.select_related('contact_message', 'quote_request', 'replied_by')
+    inquiry_type = params.get('inquiry_type', '')
+    if inquiry_type:
+        queryset = queryset.filter(inquiry_type=inquiry_type)
+    return queryset.order_by('-replied_at')
+
+
+INQUIRY_REPLY_HEADER = [
+    'ID', 'Date', 'Inquiry Type', 'Inquiry', 'To', 'Subject',
+    'Delivery Status', 'Attempts', 'Sent At', 'Replied By'
+]
+
+
+def inquiry_reply_row(reply):
+    if reply.contact_message:
+        inquiry = f'{reply.contact_message.name} (#{reply.contact_message_id})'
+    elif reply.quote_request:
+        inquiry = reply.quote_request.reference_id
+    else:
+        inquiry = ''
+    return [
+        reply.id,
+        reply.replied_at.strftime('%Y-%m-%d %H:%M'),
+        reply.get_inquiry_type_display(),
+        inquiry,
+        reply.reply_to,
+        reply.reply_subject,
+        reply.get_delivery_status_display(),
+        reply.attempts,
+        _format_date(reply.sent_at),
+        reply.replied_by.get_username() if reply.replied_by else '',
+    ]
+
+
+def export_rows(queryset, row):
+    """Rows of a queryset, read in chunks"""
+    return (row(obj) for obj in queryset.iterator(chunk_size=CHUNK_SIZE))
+
+
+# filter: params -> queryset; date_field: what a date range applies to
+Export = namedtuple('Export', ['name', 'filter', 'header', 'row', 'date_field'])
+
+EXPORTS = {
+    'contact_messages': Export(
+        'contact_messages', filter_contact_messages, CONTACT_MESSAGE_HEADER, contact_message_row, 'created_at'
+    ),
+    'inquiries': Export(
+        'inquiries', filter_inquiries, INQUIRY_HEADER, inquiry_row, 'created_at'
+    ),
+    'quote_requests': Export(
+        'quote_requests', filter_quote_requests, QUOTE_REQUEST_HEADER, quote_request_row, 'created_at'
+    ),
+    'inquiry_replies': Export(
+        'inquiry_replies', filter_inquiry_replies, INQUIRY_REPLY_HEADER, inquiry_reply_row, 'replied_at'
+    ),
+}
@@ -1,6 +1,7 @@
 from django import forms
 from products.models import Product, Category
-from .models import FeatureCard, CompanyStat
+from .models import FeatureCard, CompanyStat, ExportJob
+from .export_jobs import available_formats
 from inquiries.models import ContactMessage, QuoteRequest, InquiryReply
 
 
@@ -268,3 +269,35 @@ class QuoteRequestStatusForm(forms.ModelForm):
                 'placeholder': 'Internal notes for team reference (not visible to customer)'
             }),
         }
+
+
+class ExportJobForm(forms.ModelForm):
+    """Form for starting a background export"""
+
+    class Meta:
+        model = ExportJob
+        fields = ['kind', 'format', 'date_from', 'date_to']
+        labels = {
+            'kind': 'Export',
+            'date_from': 'From',
+            'date_to': 'To',
+        }
+        widgets = {
+            'kind': forms.Select(attrs={'class': 'form-select'}),
+            'format': forms.Select(attrs={'class': 'form-select'}),
+            'date_from': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'date_to': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # XLSX is only offered when openpyxl is installed
+        self.fields['format'].choices = available_formats()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('The start date must be before the end date.')
+        return cleaned_data
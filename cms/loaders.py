@@ -0,0 +1,114 @@
+"""
+Request-scoped batching loader for CMS content
+
+The template tags in cms_tags register the keys they need with the loader
+and get lazy values back. The first time one of those values is used,
+every key of the same kind requested so far is fetched with a single
+``IN`` query, and the results are kept for the rest of the request.
+Declaring lookups together at the top of a template therefore costs one
+query per model instead of one per tag.
+
+When the view names a snapshot page (``cms_page`` in the context), lookups
+are answered from that page's PageSnapshot and only keys it does not cover
+reach the content tables.
+"""
+from collections import defaultdict
+
+from django.utils.functional import SimpleLazyObject
+
+from .models import (
+    HeroSection, FeatureCard, TrustIndicator, Testimonial,
+    ClientIndustry, CompanyStat, TextContent, CallToAction
+)
+from .snapshots import SNAPSHOT_PAGES, load_page_content
+
+
+class CMSContentLoader:
+    """Collects, batches and memoizes CMS lookups for one request"""
+
+    # kind -> (model, lookup field, returns a list of rows)
+    KEYED_KINDS = {
+        'hero': (HeroSection, 'page_name', False),
+        'text_content': (TextContent, 'content_key', False),
+        'cta': (CallToAction, 'page_name', False),
+        'feature_cards': (FeatureCard, 'section_identifier', True),
+        'trust_indicators': (TrustIndicator, 'position', True),
+        'company_stats': (CompanyStat, 'section', True),
+    }
+
+    # kind -> model whose active rows are small enough to load whole
+    TABLE_KINDS = {
+        'testimonials': Testimonial,
+        'client_industries': ClientIndustry,
+    }
+
+    def __init__(self, page_name=None, page_content=None):
+        self.page_name = page_name
+        self.page_content = page_content
+        self._pending = defaultdict(set)
+        self._results = defaultdict(dict)
+        self._tables = {}
+
+    def get(self, kind, key):
+        """
+        Return the row (or list of rows) of ``kind`` for ``key``.
+        Unknown keys are queued and resolved lazily in one batch.
+        """
+        if self.page_content is not None:
+            found, value = self.page_content.lookup(kind, key, self.page_name)
+            if found:
+                return value
+
+        results = self._results[kind]
+        if key in results:
+            return results[key]
+        self._pending[kind].add(key)
+        return SimpleLazyObject(lambda: self._resolve(kind, key))
+
+    def get_all(self, kind):
+        """Return every active row of a small table, loaded once per request"""
+        if self.page_content is not None and kind in self.page_content.tables:
+            return self.page_content.tables[kind]
+        if kind not in self._tables:
+            self._tables[kind] = list(self.TABLE_KINDS[kind].objects.filter(is_active=True))
+        return self._tables[kind]
+
+    def _resolve(self, kind, key):
+        results = self._results[kind]
+        if key not in results:
+            self._pending[kind].add(key)
+            self._fetch(kind)
+        return results[key]
+
+    def _fetch(self, kind):
+        model, field, many = self.KEYED_KINDS[kind]
+        keys = self._pending.pop(kind)
+        results = self._results[kind]
+
+        for key in keys:
+            results[key] = [] if many else None
+
+        rows = model.objects.filter(is_active=True, **{f'{field}__in': keys})
+        for row in rows:
+            if many:
+                results[getattr(row, field)].append(row)
+            else:
+                results[getattr(row, field)] = row
+
+
+def get_loader(context):
+    """
+    Return the loader attached to the request being rendered.
+    Templates rendered without a request get a loader of their own.
+    """
+    request = context.get('request')
+    loader = getattr(request, '_cms_content_loader', None)
+    if loader is None:
+        page_name = context.get('cms_page')
+        if page_name in SNAPSHOT_PAGES:
+            loader = CMSContentLoader(page_name, load_page_content(page_name))
+        else:
+            loader = CMSContentLoader()
+        if request is not None:
+            request._cms_content_loader = loader
+    return loader
@@ -0,0 +1,46 @@
+"""
+Management command to pre-render the public site to static HTML files
+"""
+from argparse import BooleanOptionalAction
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cms.static_export import export_pending, export_site
+
+
+class Command(BaseCommand):
+    help = 'Renders every public page to HTML files the web server can serve without Django'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.STATIC_EXPORT_ROOT,
+            help='Build directory (default: STATIC_EXPORT_ROOT)'
+        )
+        parser.add_argument(
+            '--compress',
+            action=BooleanOptionalAction,
+            default=settings.STATIC_EXPORT_COMPRESS,
+            help='Also write gzip (and brotli, if installed) variants'
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Only re-render the groups queued by purges (into STATIC_EXPORT_ROOT), e.g. from cron'
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            if not settings.STATIC_EXPORT_ROOT:
+                raise CommandError('STATIC_EXPORT_ROOT is not set')
+            groups = export_pending()
+            self.stdout.write(self.style.SUCCESS(f'Exported {len(groups)} pending group(s)'))
+            return
+
+        if not options['output']:
+            raise CommandError('No build directory: pass --output or set STATIC_EXPORT_ROOT')
+
+        written, removed = export_site(options['output'], options['compress'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {written} page(s) to {options["output"]}, removed {removed}'
+        ))
@@ -0,0 +1,25 @@
+"""
+Management command to recompile the published page snapshots
+"""
+from django.core.management.base import BaseCommand, CommandError
+from cms.snapshots import SNAPSHOT_PAGES, rebuild_page_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the page snapshots used to render public CMS pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages',
+            nargs='*',
+            help=f'Pages to rebuild (default: all). Choices: {", ".join(SNAPSHOT_PAGES)}'
+        )
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or list(SNAPSHOT_PAGES)
+        unknown = [page for page in pages if page not in SNAPSHOT_PAGES]
+        if unknown:
+            raise CommandError(f'Unknown page(s): {", ".join(unknown)}')
+
+        rebuild_page_snapshots(pages)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(pages)} page snapshot(s): {", ".join(pages)}'))
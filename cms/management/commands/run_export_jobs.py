@@ -0,0 +1,38 @@
+"""
+Management command to run pending export jobs and remove old ones
+"""
+from django.core.management.base import BaseCommand
+from cms.export_jobs import purge_old_jobs, reclaim_stale_jobs, run_export_job
+from cms.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs export jobs left pending by a worker restart or running by a '
+        'worker that died, and with '
+        '--purge deletes jobs older than EXPORT_RETENTION_DAYS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Delete old export jobs and their files'
+        )
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            deleted = purge_old_jobs()
+            self.stdout.write(f'Deleted {deleted} old export job(s)')
+
+        reclaimed = reclaim_stale_jobs()
+        if reclaimed:
+            self.stdout.write(f'Reclaimed {reclaimed} export job(s) left running by a stopped worker')
+
+        pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).values_list('pk', flat=True)
+        results = [run_export_job(pk) for pk in list(pending)]
+
+        failed = results.count(ExportJob.STATUS_FAILED)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {results.count(ExportJob.STATUS_DONE)} export job(s), {failed} failed'
+        ))
@@ -0,0 +1,46 @@
+"""
+Middleware for the CMS app
+"""
+import os
+
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class ThemeWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also serves the compiled theme stylesheets (cms/theme.py).
+
+    WhiteNoise indexes its files once at startup, but theme stylesheets are
+    compiled later by whichever worker saves the theme. Files under
+    THEME_CSS_URL are therefore looked up on first request and then served
+    like any other static file. Their names carry a content hash, so they
+    are always sent with immutable caching headers.
+    """
+
+    def __init__(self, get_response=None, settings=settings):
+        # Set before WhiteNoise indexes its files, which calls immutable_file_test
+        self.theme_prefix = settings.THEME_CSS_URL
+        self.theme_root = os.path.abspath(settings.THEME_CSS_ROOT) + os.path.sep
+        super().__init__(get_response, settings=settings)
+        if self.autorefresh:
+            # Development: WhiteNoise already searches its directories per request
+            self.add_files(self.theme_root, prefix=self.theme_prefix)
+
+    def __call__(self, request):
+        path = request.path_info
+        if not self.autorefresh and path.startswith(self.theme_prefix) and path not in self.files:
+            self.add_theme_file(path)
+        return super().__call__(request)
+
+    def add_theme_file(self, url):
+        if not self.url_is_canonical(url):
+            return
+        path = os.path.join(self.theme_root, url[len(self.theme_prefix):])
+        if self.path_is_child_of(path, self.theme_root) and os.path.isfile(path):
+            self.add_file_to_dictionary(url, path)
+
+    def immutable_file_test(self, path, url):
+        if url.startswith(self.theme_prefix):
+            return True
+        return super().immutable_file_test(path, url)
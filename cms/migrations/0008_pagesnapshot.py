@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0007_sitesettings_whatsapp_float_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageSnapshot',
+            fields=[
+                ('page_name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('data', models.TextField(help_text='Serialized page content (JSON)')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Page Snapshot',
+                'verbose_name_plural': 'Page Snapshots',
+                'ordering': ['page_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0008_pagesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='themesettings',
+            name='css_file',
+            field=models.CharField(blank=True, editable=False, help_text='Fingerprinted stylesheet file name', max_length=100),
+        ),
+    ]
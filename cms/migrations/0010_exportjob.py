@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:40
+
+import cms.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cms', '0009_themesettings_css_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contact_messages', 'Contact Messages'), ('inquiries', 'Product Inquiries'), ('quote_requests', 'Quote Requests'), ('inquiry_replies', 'Inquiry Replies')], max_length=30)),
+                ('format', models.CharField(choices=[('csv', 'CSV (gzip compressed)'), ('xlsx', 'Excel (XLSX)')], default='csv', max_length=10)),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Filters of the CMS list it was started from')),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('processed_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('file', models.FileField(blank=True, editable=False, storage=cms.models.export_storage, upload_to='')),
+                ('error', models.TextField(blank=True, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_by', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
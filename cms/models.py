@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .cache_utils import load_singleton, singleton_stamp, bump_version_on_commit
+from .theme import compile_theme_css
+
 
 class SiteSettings(models.Model):
     """
@@ -76,6 +81,8 @@ class SiteSettings(models.Model):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        # Invalidate the cached copy held by every worker
+        bump_version_on_commit(singleton_stamp(type(self)))
 
     def delete(self, *args, **kwargs):
         # Prevent deletion
@@ -83,8 +90,8 @@ class SiteSettings(models.Model):
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        """Load the singleton instance (cached per worker, see cache_utils)"""
+        return load_singleton(cls)
 
 
 class HeroSection(models.Model):
@@ -398,6 +405,91 @@ class MediaFile(models.Model):
         return self.file_type == 'image'
 
 
+class PageSnapshot(models.Model):
+    """
+    Published content of a public page, compiled from the CMS content models
+    into one serialized row whenever that content is saved (see cms/snapshots.py).
+    """
+    page_name = models.CharField(max_length=50, primary_key=True)
+    data = models.TextField(help_text='Serialized page content (JSON)')
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Page Snapshot'
+        verbose_name_plural = 'Page Snapshots'
+        ordering = ['page_name']
+
+    def __str__(self):
+        return f"Snapshot - {self.page_name}"
+
+
+def export_storage():
+    # Exports hold customer details: kept outside MEDIA_ROOT, served to staff only
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+class ExportJob(models.Model):
+    """A background export of inquiries to a file (see cms/export_jobs.py)"""
+
+    KIND_CHOICES = [
+        ('contact_messages', 'Contact Messages'),
+        ('inquiries', 'Product Inquiries'),
+        ('quote_requests', 'Quote Requests'),
+        ('inquiry_replies', 'Inquiry Replies'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV (gzip compressed)'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    filters = models.JSONField(default=dict, blank=True, help_text='Filters of the CMS list it was started from')
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, editable=False)
+    total_rows = models.PositiveIntegerField(default=0, editable=False)
+    processed_rows = models.PositiveIntegerField(default=0, editable=False)
+    file = models.FileField(storage=export_storage, blank=True, editable=False)
+    error = models.TextField(blank=True, editable=False)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a worker claimed the job, to reclaim jobs whose worker died
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
+
+    @property
+    def progress(self):
+        """Percentage of the rows written so far"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, self.processed_rows * 100 // self.total_rows)
+
+
 class ThemeSettings(models.Model):
     """
     Singleton model for theme customization.
@@ -503,6 +595,9 @@ class ThemeSettings(models.Model):
     box_shadow_default = models.CharField(max_length=100, default='0 4px 6px rgba(0, 0, 0, 0.08)', help_text='Default box shadow')
     box_shadow_hover = models.CharField(max_length=100, default='0 8px 15px rgba(0, 0, 0, 0.15)', help_text='Hover box shadow')
 
+    # Compiled stylesheet (see cms/theme.py)
+    css_file = models.CharField(max_length=100, blank=True, editable=False, help_text='Fingerprinted stylesheet file name')
+
     # Timestamps
     updated_at = models.DateTimeField(auto_now=True)
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -517,7 +612,11 @@ class ThemeSettings(models.Model):
     def save(self, *args, **kwargs):
         # Ensure only one instance exists
         self.pk = 1
+        # Compile the stylesheet once here rather than on every page view
+        self.css_file = compile_theme_css(self)
         super().save(*args, **kwargs)
+        # Invalidate the cached copy held by every worker
+        bump_version_on_commit(singleton_stamp(type(self)))
 
     def delete(self, *args, **kwargs):
         # Prevent deletion
@@ -525,9 +624,8 @@ class ThemeSettings(models.Model):
 
     @classmethod
     def load(cls):
-        """Load or create the singleton instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        """Load or create the singleton instance (cached per worker, see cache_utils)"""
+        return load_singleton(cls)
 
     def apply_palette(self, palette_name):
         """Apply a pre-configured color palette"""
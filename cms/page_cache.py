@@ -0,0 +1,137 @@
+"""
+Full-page cache for anonymous visitors
+
+Public views are wrapped with ``cache_public_page``. Each cached page
+belongs to one or more invalidation groups (e.g. ``'site'``,
+``'cms:home'``, ``'product:<slug>'``) and its cache key includes the
+current version of every group, so purging a group makes exactly the pages
+that depend on it miss on their next request.
+
+Versions live in the shared Django cache, so a purge in one worker is seen
+by all of them.
+
+The same versions double as HTTP validators: every cacheable response gets
+an ETag and Last-Modified derived from them, and revisits carrying a
+matching If-None-Match / If-Modified-Since get a 304 before the view or the
+page cache is touched.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .static_export import queue_groups
+
+
+GROUP_KEY = 'pagecache:group:{}'
+PAGE_KEY = 'pagecache:page:{}'
+
+
+def _new_version():
+    # Time-based so a group whose version was evicted can never fall back
+    # to an old value and revive stale pages
+    return time.time_ns()
+
+
+def get_group_versions(groups):
+    keys = [GROUP_KEY.format(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def purge_groups(*groups):
+    """Invalidate every cached page belonging to any of ``groups``"""
+    cache.set_many({GROUP_KEY.format(group): _new_version() for group in groups}, timeout=None)
+    if settings.STATIC_EXPORT_ROOT:
+        queue_groups(groups)
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Staff (and any signed-in user) always see live pages
+    if request.user.is_authenticated:
+        return False
+    # Pages carrying flash messages are personal
+    if len(get_messages(request)):
+        return False
+    return True
+
+
+def _page_digest(request, params, versions):
+    query = '&'.join(
+        f'{name}={value}'
+        for name in params
+        for value in request.GET.getlist(name)
+    )
+    raw = '|'.join([request.scheme, request.get_host(), request.path, query] + [str(v) for v in versions])
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the page but revalidate it on every visit
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_public_page(*groups, params=()):
+    """
+    Cache a view's HTML for anonymous visitors.
+
+    ``groups`` are invalidation groups and may use the view's keyword
+    arguments, e.g. ``'product:{slug}'``. ``params`` lists the query
+    parameters that change the page; all others are ignored.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            page_groups = ['site'] + [group.format(**kwargs) for group in groups]
+            versions = get_group_versions(page_groups)
+            digest = _page_digest(request, params, versions)
+
+            # A group's version is the time of its last purge, so the newest
+            # one is when the page last changed
+            etag = f'"{digest}"'
+            last_modified = max(versions) // 1_000_000_000
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            key = PAGE_KEY.format(digest)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                return _set_validators(response, etag, last_modified)
+
+            response = view_func(request, *args, **kwargs)
+
+            # Pages that embed a CSRF token or set cookies are per-visitor
+            if (response.status_code == 200
+                    and not response.streaming
+                    and not response.cookies
+                    and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')):
+                cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+                _set_validators(response, etag, last_modified)
+            return response
+
+        # Read by the static export to find the pages a purge affects
+        wrapper.page_groups = groups
+        wrapper.page_params = params
+        return wrapper
+    return decorator
@@ -0,0 +1,254 @@
+"""
+Keyset pagination for the CMS lists
+
+Pages are fetched with ``WHERE (key) < (last key seen) ORDER BY key LIMIT
+n`` instead of OFFSET, so a deep page costs the same as the first one. The
+key is the queryset's ordering plus the primary key as a tie-breaker;
+nullable columns sort last. The position is passed between requests as an
+opaque, signed ``cursor`` parameter; a missing or tampered cursor shows
+the first page.
+
+Instead of an exact COUNT(*) the paginator reports an estimated total:
+either a cheap figure supplied by the view (e.g. a cached count) or a count
+capped at ``COUNT_LIMIT`` rows.
+"""
+from urllib.parse import urlencode
+
+from django.core import signing
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+
+
+# Counts stop here: "1000+" costs no more on a million rows than on a thousand
+COUNT_LIMIT = 1000
+
+CURSOR_PARAM = 'cursor'
+
+_SALT = 'cms.pagination'
+
+
+class Key:
+    """One column of the ordering"""
+
+    def __init__(self, field, descending):
+        self.field = field
+        self.name = field.attname
+        self.descending = descending
+        self.nullable = field.null
+
+    def order_by(self, reverse=False):
+        descending = self.descending != reverse
+        if self.nullable:
+            # Nulls last going forward, hence first going backward
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            return F(self.name).desc(**nulls) if descending else F(self.name).asc(**nulls)
+        return f"-{self.name}" if descending else self.name
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.name}__isnull': True})
+        return Q(**{self.name: value})
+
+    def after(self, value):
+        """Rows that come after ``value`` going forward"""
+        if value is None:
+            return Q(pk__in=[])
+        q = Q(**{f"{self.name}__{'lt' if self.descending else 'gt'}": value})
+        if self.nullable:
+            q |= Q(**{f'{self.name}__isnull': True})
+        return q
+
+    def before(self, value):
+        """Rows that come before ``value`` going forward"""
+        if value is None:
+            return Q(**{f'{self.name}__isnull': False})
+        return Q(**{f"{self.name}__{'gt' if self.descending else 'lt'}": value})
+
+
+def ordering_keys(queryset):
+    """The Keys of a queryset's ordering, ending with the primary key"""
+    opts = queryset.model._meta
+    keys = []
+    for item in queryset.query.order_by or opts.ordering:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            name, descending = item.expression.name, item.descending
+        elif isinstance(item, str):
+            name, descending = item.lstrip('-'), item.startswith('-')
+        else:
+            raise ValueError(f'Cannot paginate by {item!r}')
+        field = opts.pk if name == 'pk' else opts.get_field(name)
+        if field.is_relation and not field.many_to_one:
+            raise ValueError(f'Cannot paginate by {name!r}')
+        keys.append(Key(field, descending))
+        if field.primary_key:
+            return keys
+    # The primary key makes every key unique; it follows the last direction
+    keys.append(Key(opts.pk, keys[-1].descending if keys else False))
+    return keys
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def next_cursor(self):
+        return self.paginator.cursor('next', self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.cursor('prev', self.object_list[0]) if self._has_previous else None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its ordering. ``estimate`` is an optional
+    callable returning the total number of rows (or None when it has no
+    estimate), used instead of a capped count.
+    """
+
+    def __init__(self, queryset, per_page, estimate=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.estimate = estimate
+        self.keys = ordering_keys(queryset)
+
+    def cursor(self, direction, obj):
+        values = [
+            None if getattr(obj, key.name) is None else key.field.value_to_string(obj) for key in self.keys
+        ]
+        return signing.dumps([direction, values], salt=_SALT)
+
+    def _decode(self, cursor):
+        """(direction, values) of a cursor, or None for the first page"""
+        if not cursor:
+            return None
+        try:
+            direction, raw = signing.loads(cursor, salt=_SALT)
+            if direction == 'last':
+                return direction, None
+            if direction not in ('next', 'prev') or len(raw) != len(self.keys):
+                return None
+            return direction, [None if v is None else key.field.to_python(v) for key, v in zip(self.keys, raw)]
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+
+    @cached_property
+    def last_cursor(self):
+        return signing.dumps(['last', None], salt=_SALT)
+
+    def _seek(self, values, compare):
+        """Rows strictly after (or before) ``values`` in the key order"""
+        condition = Q(pk__in=[])
+        prefix = Q()
+        for key, value in zip(self.keys, values):
+            condition |= prefix & getattr(key, compare)(value)
+            prefix &= key.equal(value)
+
+        # A plain range on the first column lets the database seek its index
+        first, value = self.keys[0], values[0]
+        if not first.nullable and value is not None:
+            lookup = 'lte' if first.descending == (compare == 'after') else 'gte'
+            condition &= Q(**{f'{first.name}__{lookup}': value})
+        return condition
+
+    def _fetch(self, queryset, reverse):
+        ordering = [key.order_by(reverse) for key in self.keys]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+        return rows, more
+
+    def page(self, cursor=None):
+        position = self._decode(cursor)
+        if position is None:
+            rows, more = self._fetch(self.queryset, reverse=False)
+            return KeysetPage(rows, self, False, more)
+
+        direction, values = position
+        if direction == 'next':
+            rows, more = self._fetch(self.queryset.filter(self._seek(values, 'after')), reverse=False)
+            if rows:
+                return KeysetPage(rows, self, True, more)
+        elif direction == 'prev':
+            rows, more = self._fetch(self.queryset.filter(self._seek(values, 'before')), reverse=True)
+            if rows:
+                # Without more rows this is the first page, possibly a short one
+                return KeysetPage(rows, self, more, True)
+        else:
+            rows, more = self._fetch(self.queryset, reverse=True)
+            return KeysetPage(rows, self, more, False)
+
+        # Ran off either end, e.g. rows were deleted meanwhile: start over
+        return self.page()
+
+    @cached_property
+    def estimated_count(self):
+        """The estimate if one is available, else the row count up to COUNT_LIMIT + 1"""
+        count = self.estimate() if self.estimate is not None else None
+        if count is None:
+            count = self.queryset.order_by()[:COUNT_LIMIT + 1].count()
+            self.count_is_capped = count > COUNT_LIMIT
+        return count
+
+    count_is_capped = False
+
+    @property
+    def display_count(self):
+        count = self.estimated_count
+        return f'{COUNT_LIMIT:,}+' if self.count_is_capped else f'{count:,}'
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating with KeysetPaginator. Views can override
+    ``estimate_count()`` to return a cheap total, or None for a capped count.
+    """
+    paginate_by = 20
+
+    def estimate_count(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, estimate=self.estimate_count)
+        page = paginator.page(self.request.GET.get(CURSOR_PARAM))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop(CURSOR_PARAM, None)
+        params.pop('page', None)
+        params = {name: value for name, value in params.items() if value}
+
+        def url(cursor):
+            return '?' + urlencode({**params, CURSOR_PARAM: cursor} if cursor else params)
+
+        page = context.get('page_obj')
+        if page is not None:
+            context['first_page_url'] = url(None)
+            context['previous_page_url'] = url(page.previous_cursor) if page.has_previous() else None
+            context['next_page_url'] = url(page.next_cursor) if page.has_next() else None
+            context['last_page_url'] = url(page.paginator.last_cursor)
+        return context
@@ -0,0 +1,36 @@
+"""
+Signal handlers for the CMS app
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import SiteSettings, ThemeSettings
+from .page_cache import purge_groups
+from .snapshots import SNAPSHOT_MODELS, pages_using, rebuild_page_snapshots
+
+
+def publish_pages(pages):
+    rebuild_page_snapshots(pages)
+    # Purge cached HTML only once the new snapshots are in place
+    purge_groups(*[f'cms:{page}' for page in pages])
+
+
+def rebuild_snapshots_for(sender, **kwargs):
+    """Recompile the page snapshots that show content of ``sender``"""
+    pages = pages_using(sender)
+    if pages:
+        transaction.on_commit(lambda: publish_pages(pages))
+
+
+def purge_site_pages(sender, **kwargs):
+    """Site and theme settings appear on every page"""
+    transaction.on_commit(lambda: purge_groups('site'))
+
+
+def connect_signals():
+    for model in SNAPSHOT_MODELS:
+        post_save.connect(rebuild_snapshots_for, sender=model, dispatch_uid=f'snapshot-save-{model.__name__}')
+        post_delete.connect(rebuild_snapshots_for, sender=model, dispatch_uid=f'snapshot-delete-{model.__name__}')
+
+    for model in (SiteSettings, ThemeSettings):
+        post_save.connect(purge_site_pages, sender=model, dispatch_uid=f'page-cache-{model.__name__}')
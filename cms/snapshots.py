@@ -0,0 +1,179 @@
+"""
+Publish-time page snapshots
+
+Whenever CMS content is saved, the content of every public page that shows
+it is compiled into a single PageSnapshot row. Public views and cms_tags
+then read a page with one primary-key lookup instead of querying the eight
+content tables on every request.
+"""
+import json
+
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import (
+    HeroSection, FeatureCard, TrustIndicator, Testimonial,
+    ClientIndustry, CompanyStat, TextContent, CallToAction, PageSnapshot
+)
+
+
+# Public pages served from snapshots, with the keyed content each one shows.
+# Hero sections, text content and CTAs are always included for the page itself.
+SNAPSHOT_PAGES = {
+    'home': {
+        'text_content': ['home-intro', 'home-product-range'],
+        'trust_indicators': ['hero'],
+        'feature_cards': ['why-choose-us'],
+        'company_stats': ['home-testimonials'],
+        'testimonials': True,
+        'client_industries': True,
+    },
+    'about': {
+        'text_content': ['about-company-story'],
+        'feature_cards': ['about-vision-mission', 'how-we-work', 'values'],
+    },
+    'contact': {},
+    'request-quote': {
+        'text_content': ['request-quote-contact-methods'],
+        'feature_cards': ['quote-inclusions'],
+    },
+    'policies': {},
+}
+
+# kind -> (model, field holding the section key)
+SECTION_KINDS = {
+    'feature_cards': (FeatureCard, 'section_identifier'),
+    'trust_indicators': (TrustIndicator, 'position'),
+    'company_stats': (CompanyStat, 'section'),
+}
+
+TABLE_KINDS = {
+    'testimonials': Testimonial,
+    'client_industries': ClientIndustry,
+}
+
+PAGE_MODELS = (HeroSection, TextContent, CallToAction)
+
+SNAPSHOT_MODELS = PAGE_MODELS + tuple(m for m, f in SECTION_KINDS.values()) + tuple(TABLE_KINDS.values())
+
+
+def _dump(objects):
+    return serializers.serialize('python', objects)
+
+
+def _load(data):
+    return [d.object for d in serializers.deserialize('python', data)]
+
+
+def compile_page(page_name):
+    """Compile the current content of a page into a JSON-serializable dict"""
+    sections = SNAPSHOT_PAGES[page_name]
+    data = {
+        'hero': _dump(HeroSection.objects.filter(page_name=page_name, is_active=True)),
+        'cta': _dump(CallToAction.objects.filter(page_name=page_name, is_active=True)),
+        # Kept with inactive rows: the policy views do not filter on is_active
+        'text_content': _dump(TextContent.objects.filter(
+            Q(page_name=page_name) | Q(content_key__in=sections.get('text_content', []))
+        )),
+        'text_keys': sections.get('text_content', []),
+    }
+
+    for kind, (model, field) in SECTION_KINDS.items():
+        keys = sections.get(kind, [])
+        if keys:
+            rows = model.objects.filter(is_active=True, **{f'{field}__in': keys})
+            data[kind] = {'keys': keys, 'rows': _dump(rows)}
+
+    for kind, model in TABLE_KINDS.items():
+        if sections.get(kind):
+            data[kind] = _dump(model.objects.filter(is_active=True))
+
+    return data
+
+
+def build_page_snapshot(page_name):
+    """Compile a page and store it as its snapshot row"""
+    data = compile_page(page_name)
+    snapshot, created = PageSnapshot.objects.update_or_create(
+        page_name=page_name,
+        defaults={'data': json.dumps(data, cls=DjangoJSONEncoder)}
+    )
+    return snapshot
+
+
+def pages_using(model):
+    """Snapshot pages that include content from ``model``"""
+    if model in PAGE_MODELS:
+        return list(SNAPSHOT_PAGES)
+
+    kinds = [k for k, (m, f) in SECTION_KINDS.items() if m is model]
+    kinds += [k for k, m in TABLE_KINDS.items() if m is model]
+    return [page for page, sections in SNAPSHOT_PAGES.items()
+            if any(sections.get(kind) for kind in kinds)]
+
+
+def rebuild_page_snapshots(page_names=None):
+    """Rebuild the given pages (all snapshot pages by default)"""
+    for page_name in page_names or SNAPSHOT_PAGES:
+        build_page_snapshot(page_name)
+
+
+class PageContent:
+    """Deserialized content of one page snapshot"""
+
+    def __init__(self, data):
+        heroes = _load(data['hero'])
+        ctas = _load(data['cta'])
+        self.hero = heroes[0] if heroes else None
+        self.cta = ctas[0] if ctas else None
+        self.text_content = _load(data['text_content'])
+        self.text_keys = set(data['text_keys'])
+        self.sections = {}
+        self.tables = {}
+
+        for kind, (model, field) in SECTION_KINDS.items():
+            if kind in data:
+                grouped = {key: [] for key in data[kind]['keys']}
+                for row in _load(data[kind]['rows']):
+                    grouped[getattr(row, field)].append(row)
+                self.sections[kind] = grouped
+
+        for kind in TABLE_KINDS:
+            if kind in data:
+                self.tables[kind] = _load(data[kind])
+
+    def lookup(self, kind, key, page_name):
+        """
+        Return ``(found, value)`` for a cms_tags lookup.
+        ``found`` is False when the snapshot does not cover the key.
+        """
+        if kind in ('hero', 'cta'):
+            if key == page_name:
+                return True, getattr(self, kind)
+        elif kind == 'text_content':
+            for text in self.text_content:
+                if text.content_key == key and text.is_active:
+                    return True, text
+            if key in self.text_keys:
+                return True, None
+        elif key in self.sections.get(kind, {}):
+            return True, self.sections[kind][key]
+        return False, None
+
+    def get_text_by_section(self, section_identifier):
+        for text in self.text_content:
+            if text.section_identifier == section_identifier:
+                return text
+        return None
+
+
+def load_page_content(page_name):
+    """
+    Load a page's snapshot with a single primary-key read.
+    A missing snapshot is built on the spot.
+    """
+    snapshot = PageSnapshot.objects.filter(pk=page_name).first()
+    if snapshot is None:
+        snapshot = build_page_snapshot(page_name)
+    return PageContent(json.loads(snapshot.data))
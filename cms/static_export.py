@@ -0,0 +1,252 @@
+"""
+Static export of the public site
+
+Every page served through cache_public_page is rendered to
+``<root>/<path>/index.html`` (plus gzip/brotli variants) so the front-end
+web server can answer anonymous visitors without starting a Python worker.
+Category-filtered product lists are written next to the list page as
+``index.category=<slug>.html``.
+
+The web server should only serve these files for GET requests without a
+query string (other than ``category``) and without a session cookie; every
+other request still goes to Django.
+
+A manifest in the export root records the invalidation groups of every
+exported page. When page-cache groups are purged (see page_cache) and
+STATIC_EXPORT_ROOT is set, the groups are added to a pending list in the
+export root and a background thread renders the exported pages in them
+again, so the request that saved the change does not wait for it; pages
+that no longer exist are removed. Purges made while an export runs are
+merged and exported together afterwards. Groups left pending by a
+restarted worker are exported by ``export_static_site --pending``.
+"""
+import fcntl
+import gzip
+import io
+import json
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import URLResolver, Resolver404, get_resolver, resolve, reverse
+
+from products.models import Category, Product
+from .theme import _write_atomic, brotli
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.pages.json'
+PENDING_NAME = '.pending.json'
+VARIANTS = ('', '.gz', '.br')
+
+_handler = None
+
+
+def _get_handler():
+    global _handler
+    if _handler is None:
+        handler = BaseHandler()
+        handler.load_middleware()
+        _handler = handler
+    return _handler
+
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif hasattr(pattern.callback, 'page_groups') and not pattern.pattern.converters:
+            yield '/' + prefix + str(pattern.pattern)
+
+
+def public_urls():
+    """Every exportable URL: fixed pages, category lists and product pages"""
+    urls = list(_walk(get_resolver().url_patterns))
+
+    list_url = reverse('products:list')
+    for slug in Category.objects.values_list('slug', flat=True):
+        urls.append(f'{list_url}?{urlencode({"category": slug})}')
+
+    for slug in Product.objects.filter(is_active=True).values_list('slug', flat=True):
+        urls.append(reverse('products:detail', kwargs={'slug': slug}))
+    return urls
+
+
+def page_groups(url):
+    """Page-cache groups of the view behind ``url``"""
+    try:
+        match = resolve(url.partition('?')[0])
+    except Resolver404:
+        return []
+    groups = getattr(match.func, 'page_groups', None)
+    if groups is None:
+        return []
+    return ['site'] + [group.format(**match.kwargs) for group in groups]
+
+
+def output_path(root, url):
+    """File an exported page is written to"""
+    path, _, query = url.partition('?')
+    directory = Path(root) / path.strip('/')
+    return directory / (f'index.{query}.html' if query else 'index.html')
+
+
+def render_url(url):
+    """Render ``url`` as an anonymous visitor would see it"""
+    path, _, query = url.partition('?')
+    secure = not settings.DEBUG
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': settings.STATIC_EXPORT_HOST,
+        'SERVER_PORT': '443' if secure else '80',
+        'HTTP_HOST': settings.STATIC_EXPORT_HOST,
+        'wsgi.url_scheme': 'https' if secure else 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    })
+    return _get_handler().get_response(request)
+
+
+def _load_manifest(root):
+    try:
+        return json.loads((Path(root) / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_page(path, content, compress):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Compressed variants first, so a server never finds them missing
+    if compress:
+        _write_atomic(path.with_name(path.name + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(path.with_name(path.name + '.br'), brotli.compress(content))
+    _write_atomic(path, content)
+
+
+def _remove_page(path):
+    for suffix in VARIANTS:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def export_pages(urls, root=None, compress=None):
+    """
+    Render ``urls`` into the export root.
+    Returns the number of pages written and removed.
+    """
+    root = Path(root or settings.STATIC_EXPORT_ROOT)
+    compress = settings.STATIC_EXPORT_COMPRESS if compress is None else compress
+    manifest = _load_manifest(root)
+    written = removed = 0
+
+    for url in urls:
+        path = output_path(root, url)
+        response = render_url(url)
+        if (response.status_code == 200 and not response.streaming
+                and response['Content-Type'].startswith('text/html')):
+            _write_page(path, response.content, compress)
+            manifest[url] = page_groups(url)
+            written += 1
+        elif url in manifest or path.exists():
+            # Deactivated, deleted or renamed
+            _remove_page(path)
+            manifest.pop(url, None)
+            removed += 1
+
+    root.mkdir(parents=True, exist_ok=True)
+    _write_atomic(root / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    return written, removed
+
+
+def export_site(root=None, compress=None):
+    """Export every public page and drop pages that no longer exist"""
+    root = root or settings.STATIC_EXPORT_ROOT
+    urls = dict.fromkeys(public_urls())
+    urls.update(dict.fromkeys(_load_manifest(root)))
+    return export_pages(urls, root, compress)
+
+
+def export_groups(groups):
+    """Re-render the exported pages belonging to any of ``groups``"""
+    manifest = _load_manifest(settings.STATIC_EXPORT_ROOT)
+    groups = set(groups)
+    if 'site' in groups:
+        export_site()
+        return
+
+    urls = [url for url, url_groups in manifest.items() if groups.intersection(url_groups)]
+    # Pages that did not exist at the last export, e.g. new products
+    urls += [url for url in public_urls()
+             if url not in manifest and groups.intersection(page_groups(url))]
+    if urls:
+        export_pages(urls)
+
+
+@contextmanager
+def _pending_groups():
+    """The pending group list, locked against other processes; assign to it to save"""
+    root = Path(settings.STATIC_EXPORT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / '.pending.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = root / PENDING_NAME
+        try:
+            pending = set(json.loads(path.read_text()))
+        except (FileNotFoundError, ValueError):
+            pending = set()
+        groups = set(pending)
+        yield groups
+        if groups != pending:
+            _write_atomic(path, json.dumps(sorted(groups)).encode('utf-8'))
+
+
+def export_pending():
+    """Export the pending groups. Returns the groups exported."""
+    with _pending_groups() as groups:
+        taken = set(groups)
+        groups.clear()
+    if not taken:
+        return taken
+    try:
+        # A site-wide export covers every other group
+        export_groups({'site'} if 'site' in taken else taken)
+    except Exception:
+        with _pending_groups() as groups:
+            groups.update(taken)
+        raise
+    return taken
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='static-export')
+
+
+def _export_in_background():
+    close_old_connections()
+    try:
+        export_pending()
+    except Exception:
+        logger.exception('Static export failed; the groups stay pending')
+    finally:
+        connection.close()
+
+
+def queue_groups(groups):
+    """Mark ``groups`` for export and export them on the background thread"""
+    try:
+        with _pending_groups() as pending:
+            pending.update(groups)
+    except OSError:
+        # The purge itself has happened; the export catches up later
+        logger.exception('Could not queue static export of groups %s', sorted(groups))
+        return
+    _executor.submit(_export_in_background)
@@ -3,11 +3,9 @@ Template tags for accessing CMS data in frontend templates
 """
 import logging
 from django import template
-from cms.models import (
-    SiteSettings, HeroSection, FeatureCard, TrustIndicator,
-    Testimonial, ClientIndustry, CompanyStat, TextContent,
-    CallToAction
-)
+from cms.models import SiteSettings, ThemeSettings
+from cms.loaders import get_loader
+from cms.theme import theme_css_url as compiled_theme_css_url
 
 logger = logging.getLogger(__name__)
 register = template.Library()
@@ -23,60 +21,56 @@ def get_site_settings():
 
 
 @register.simple_tag
-def get_hero(page_name):
+def theme_css_url():
+    """
+    URL of the compiled, fingerprinted theme stylesheet
+    Usage: <link rel="stylesheet" href="{% theme_css_url %}">
+    """
+    return compiled_theme_css_url(ThemeSettings.load())
+
+
+# Content lookups go through the request-scoped loader in cms.loaders, so
+# lookups of the same kind on a page are batched into a single query.
+
+@register.simple_tag(takes_context=True)
+def get_hero(context, page_name):
     """
     Get hero section for a specific page
     Usage: {% get_hero 'home' as hero %}
     """
-    try:
-        return HeroSection.objects.get(page_name=page_name, is_active=True)
-    except HeroSection.DoesNotExist:
-        return None
+    return get_loader(context).get('hero', page_name)
 
 
-@register.simple_tag
-def get_trust_indicators(position='hero'):
+@register.simple_tag(takes_context=True)
+def get_trust_indicators(context, position='hero'):
     """
     Get trust indicators for a specific position
     Usage: {% get_trust_indicators 'hero' as trust_indicators %}
     """
-    return TrustIndicator.objects.filter(position=position, is_active=True)
+    return get_loader(context).get('trust_indicators', position)
 
 
-@register.simple_tag
-def get_text_content(content_key):
+@register.simple_tag(takes_context=True)
+def get_text_content(context, content_key):
     """
     Get text content by unique key
     Usage: {% get_text_content 'home-intro' as intro %}
     """
-    try:
-        return TextContent.objects.get(content_key=content_key, is_active=True)
-    except TextContent.DoesNotExist:
-        return None
+    return get_loader(context).get('text_content', content_key)
 
 
-@register.simple_tag
-def get_feature_cards(section_identifier):
+@register.simple_tag(takes_context=True)
+def get_feature_cards(context, section_identifier):
     """
     Get feature cards for a specific section
     Usage: {% get_feature_cards 'why-choose-us' as features %}
     """
-    return FeatureCard.objects.filter(
-        section_identifier=section_identifier,
-        is_active=True
-    )
+    return get_loader(context).get('feature_cards', section_identifier)
 
 
-@register.simple_tag
-def get_testimonials(featured_only=False, limit=None):
-    """
-    Get testimonials, optionally filtered by featured status
-    Usage: {% get_testimonials featured_only=True limit=3 as testimonials %}
-    """
-    testimonials = Testimonial.objects.filter(is_active=True)
-
+def _filter_testimonials(testimonials, featured_only, limit):
     if featured_only:
-        testimonials = testimonials.filter(is_featured=True)
+        testimonials = [t for t in testimonials if t.is_featured]
 
     if limit:
         testimonials = testimonials[:limit]
@@ -84,99 +78,90 @@ def get_testimonials(featured_only=False, limit=None):
     return testimonials
 
 
-@register.simple_tag
-def get_client_industries():
+@register.simple_tag(takes_context=True)
+def get_testimonials(context, featured_only=False, limit=None):
+    """
+    Get testimonials, optionally filtered by featured status
+    Usage: {% get_testimonials featured_only=True limit=3 as testimonials %}
+    """
+    testimonials = get_loader(context).get_all('testimonials')
+    return _filter_testimonials(testimonials, featured_only, limit)
+
+
+@register.simple_tag(takes_context=True)
+def get_client_industries(context):
     """
     Get all active client industries
     Usage: {% get_client_industries as industries %}
     """
-    return ClientIndustry.objects.filter(is_active=True)
+    return get_loader(context).get_all('client_industries')
 
 
-@register.simple_tag
-def get_company_stats(section='home-testimonials'):
+@register.simple_tag(takes_context=True)
+def get_company_stats(context, section='home-testimonials'):
     """
     Get company statistics for a specific section
     Usage: {% get_company_stats 'home-testimonials' as stats %}
     """
-    return CompanyStat.objects.filter(section=section, is_active=True)
+    return get_loader(context).get('company_stats', section)
 
 
-@register.simple_tag
-def get_cta(page_name):
+@register.simple_tag(takes_context=True)
+def get_cta(context, page_name):
     """
     Get call-to-action for a specific page
     Usage: {% get_cta 'home' as cta %}
     """
-    try:
-        return CallToAction.objects.get(page_name=page_name, is_active=True)
-    except CallToAction.DoesNotExist:
-        return None
+    return get_loader(context).get('cta', page_name)
 
 
 # Inclusion tags for complex components
 
-@register.inclusion_tag('cms/components/hero.html')
-def render_hero(page_name):
+@register.inclusion_tag('cms/components/hero.html', takes_context=True)
+def render_hero(context, page_name):
     """
     Render hero section for a page
     Usage: {% render_hero 'home' %}
     """
-    try:
-        hero = HeroSection.objects.get(page_name=page_name, is_active=True)
-    except HeroSection.DoesNotExist:
-        hero = None
-
+    loader = get_loader(context)
     return {
-        'hero': hero,
-        'trust_indicators': TrustIndicator.objects.filter(position='hero', is_active=True)
+        'hero': loader.get('hero', page_name),
+        'trust_indicators': loader.get('trust_indicators', 'hero')
     }
 
 
-@register.inclusion_tag('cms/components/testimonials.html')
-def render_testimonials(limit=3, featured_only=True):
+@register.inclusion_tag('cms/components/testimonials.html', takes_context=True)
+def render_testimonials(context, limit=3, featured_only=True):
     """
     Render testimonials section
     Usage: {% render_testimonials limit=3 featured_only=True %}
     """
-    testimonials = Testimonial.objects.filter(is_active=True)
-
-    if featured_only:
-        testimonials = testimonials.filter(is_featured=True)
-
-    if limit:
-        testimonials = testimonials[:limit]
-
+    loader = get_loader(context)
     return {
-        'testimonials': testimonials,
-        'stats': CompanyStat.objects.filter(section='home-testimonials', is_active=True)
+        'testimonials': _filter_testimonials(loader.get_all('testimonials'), featured_only, limit),
+        'stats': loader.get('company_stats', 'home-testimonials')
     }
 
 
-@register.inclusion_tag('cms/components/industries.html')
-def render_industries():
+@register.inclusion_tag('cms/components/industries.html', takes_context=True)
+def render_industries(context):
     """
     Render client industries section
     Usage: {% render_industries %}
     """
     return {
-        'industries': ClientIndustry.objects.filter(is_active=True)
+        'industries': get_loader(context).get_all('client_industries')
     }
 
 
-@register.inclusion_tag('cms/components/cta.html')
-def render_cta(page_name):
+@register.inclusion_tag('cms/components/cta.html', takes_context=True)
+def render_cta(context, page_name):
     """
     Render call-to-action section
     Usage: {% render_cta 'home' %}
     """
-    try:
-        cta = CallToAction.objects.get(page_name=page_name, is_active=True)
-    except CallToAction.DoesNotExist:
-        cta = None
-
     return {
-        'cta': cta
+        'cta': get_loader(context).get('cta', page_name)
     }
 
 
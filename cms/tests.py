@@ -1,3 +1,70 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from inquiries.models import ContactMessage
+from .exports import SORT_ORDERINGS, filter_contact_messages
+from .pagination import KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    PER_PAGE = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now() - timedelta(days=1)
+        for i in range(13):
+            message = ContactMessage.objects.create(
+                name=f'Customer {i}', email=f'customer{i}@example.com', phone='000',
+                subject='general', message='Hello',
+            )
+            # Ties in created_at and last_replied_at; a third never replied to
+            ContactMessage.objects.filter(pk=message.pk).update(
+                created_at=start + timedelta(hours=i // 3),
+                reply_count=i % 3,
+                last_replied_at=None if i % 3 == 0 else start + timedelta(hours=2, minutes=i % 4),
+            )
+
+    def paginator(self, sort):
+        return KeysetPaginator(filter_contact_messages({'sort': sort}), self.PER_PAGE)
+
+    def expected(self, sort):
+        return list(filter_contact_messages({'sort': sort}).values_list('pk', flat=True))
+
+    def test_walk_forward_from_first_page(self):
+        for sort in SORT_ORDERINGS:
+            with self.subTest(sort=sort):
+                paginator = self.paginator(sort)
+                page = paginator.page()
+                self.assertFalse(page.has_previous())
+                seen = [message.pk for message in page]
+                while page.has_next():
+                    page = paginator.page(page.next_cursor)
+                    self.assertTrue(page.has_previous())
+                    seen += [message.pk for message in page]
+                self.assertEqual(seen, self.expected(sort))
+
+    def test_walk_backward_from_last_page(self):
+        for sort in SORT_ORDERINGS:
+            with self.subTest(sort=sort):
+                paginator = self.paginator(sort)
+                page = paginator.page(paginator.last_cursor)
+                self.assertFalse(page.has_next())
+                pages = [[message.pk for message in page]]
+                while page.has_previous():
+                    page = paginator.page(page.previous_cursor)
+                    self.assertTrue(page.has_next())
+                    pages.insert(0, [message.pk for message in page])
+                self.assertEqual(sum(pages, []), self.expected(sort))
+                self.assertTrue(all(len(rows) <= self.PER_PAGE for rows in pages))
 
-# Create your tests here.
+    def test_tampered_cursor_shows_first_page(self):
+        paginator = self.paginator('last_reply')
+        first = [message.pk for message in paginator.page()]
+        cursor = paginator.page().next_cursor
+        for tampered in (cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B'), 'garbage', cursor.upper()):
+            with self.subTest(cursor=tampered):
+                page = paginator.page(tampered)
+                self.assertFalse(page.has_previous())
+                self.assertEqual([message.pk for message in page], first)
@@ -0,0 +1,82 @@
+"""
+Compiled theme stylesheet
+
+The theme CSS is rendered from ThemeSettings once per change instead of on
+every page view. Each compiled stylesheet is minified, written under
+THEME_CSS_ROOT with a content hash in its name, and stored next to gzip
+(and, when the brotli package is installed, brotli) variants so WhiteNoise
+can serve it precompressed with far-future caching headers.
+"""
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are written without it
+    brotli = None
+
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+_AFTER_COLON = re.compile(r':\s+')
+
+# Stylesheets known to exist on disk in this worker
+_verified = set()
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = _COMMENTS.sub('', css)
+    css = _WHITESPACE.sub(' ', css)
+    css = _PUNCTUATION.sub(r'\1', css)
+    css = _AFTER_COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def compile_theme_css(theme):
+    """
+    Render, minify and fingerprint the stylesheet for ``theme``.
+    Returns the file name; unchanged themes reuse the existing file.
+    """
+    css = minify_css(render_to_string('cms/theme.css', {'theme': theme})).encode('utf-8')
+    name = f'theme.{hashlib.sha256(css).hexdigest()[:12]}.css'
+
+    root = Path(settings.THEME_CSS_ROOT)
+    path = root / name
+    if not path.exists():
+        root.mkdir(parents=True, exist_ok=True)
+        # Compressed variants first, so WhiteNoise finds them with the file
+        _write_atomic(root / f'{name}.gz', gzip.compress(css, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(root / f'{name}.br', brotli.compress(css))
+        _write_atomic(path, css)
+
+    _verified.add(name)
+    return name
+
+
+def theme_css_url(theme):
+    """URL of the compiled stylesheet for ``theme``, compiling it if missing"""
+    name = theme.css_file
+    if name not in _verified:
+        if not name or not (Path(settings.THEME_CSS_ROOT) / name).exists():
+            # Fresh deployment or cleared directory: rebuild from the saved theme
+            name = compile_theme_css(theme)
+        _verified.add(name)
+    return settings.THEME_CSS_URL + name
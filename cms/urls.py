@@ -65,6 +65,7 @@ urlpatterns = [
     path('products/<int:pk>/edit/', views.ProductUpdateView.as_view(), name='product_edit'),
     path('products/<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product_delete'),
     path('products/<int:pk>/images/add/', views.product_image_add, name='product_image_add'),
+    path('products/<int:pk>/images/status/', views.product_image_status, name='product_image_status'),
     path('products/images/<int:pk>/delete/', views.ProductImageDeleteView.as_view(), name='product_image_delete'),
     path('products/images/<int:pk>/set-primary/', views.product_image_set_primary, name='product_image_set_primary'),
 
@@ -85,4 +86,9 @@ urlpatterns = [
     path('inquiries/quote-requests/<int:pk>/', views.QuoteRequestDetailView.as_view(), name='quote_request_detail'),
     path('inquiries/quote-requests/<int:pk>/delete/', views.QuoteRequestDeleteView.as_view(), name='quote_request_delete'),
     path('inquiries/quote-requests/export/', views.export_quote_requests_csv, name='quote_requests_export'),
+
+    # Background Exports
+    path('exports/', views.ExportJobListView.as_view(), name='export_jobs'),
+    path('exports/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
 ]
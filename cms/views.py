@@ -6,19 +6,26 @@ from django.views.generic import (
 )
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db import transaction
+from django.http import JsonResponse
 
 from .models import (
     SiteSettings, HeroSection, FeatureCard, TrustIndicator,
     Testimonial, ClientIndustry, CompanyStat, TextContent,
-    CallToAction, MediaFile, ThemeSettings
+    CallToAction, MediaFile, ThemeSettings, ExportJob
 )
 from products.models import Product, Category, ProductImage
+from products.processing import schedule_image_processing
+from products.signals import purge_catalog_pages
 from inquiries.models import ContactMessage, QuoteRequest
+from inquiries.stats import inquiry_stats
+from . import exports
+from .export_jobs import schedule_export_job
+from .pagination import KeysetPaginationMixin
 from .forms import (
     ProductForm, CategoryForm, FeatureCardForm, CompanyStatForm,
     ContactMessageReplyForm, QuoteRequestReplyForm,
-    ContactMessageStatusForm, QuoteRequestStatusForm
+    ContactMessageStatusForm, QuoteRequestStatusForm, ExportJobForm
 )
 
 
@@ -58,8 +65,8 @@ class DashboardView(StaffRequiredMixin, TemplateView):
         context['stats'] = {
             'products': Product.objects.filter(is_active=True).count(),
             'testimonials': Testimonial.objects.filter(is_active=True).count(),
-            'contact_messages': ContactMessage.objects.filter(status='new').count(),
-            'quote_requests': QuoteRequest.objects.filter(status='new').count(),
+            'contact_messages': inquiry_stats(ContactMessage)['new'],
+            'quote_requests': inquiry_stats(QuoteRequest)['new'],
         }
 
         # Recent activity
@@ -778,7 +785,7 @@ class CompanyStatDeleteView(StaffRequiredMixin, DeleteView):
 
 
 # Product Management
-class ProductListView(StaffRequiredMixin, ListView):
+class ProductListView(StaffRequiredMixin, KeysetPaginationMixin, ListView):
     """List all products with search and filtering"""
     model = Product
     template_name = 'cms/products/product_list.html'
@@ -786,7 +793,7 @@ class ProductListView(StaffRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Product.objects.select_related('category').prefetch_related('images')
+        queryset = Product.objects.select_related('category', 'primary_image')
         
         # Search
         search_query = self.request.GET.get('search', '')
@@ -809,7 +816,7 @@ class ProductListView(StaffRequiredMixin, ListView):
         elif status == 'coming_soon':
             queryset = queryset.filter(is_coming_soon=True)
         
-        return queryset.order_by('-is_featured', '-created_at')
+        return queryset.order_by('-is_featured', '-created_at', '-id')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -862,7 +869,7 @@ class ProductDeleteView(StaffRequiredMixin, DeleteView):
 
 
 # Category Management
-class CategoryListView(StaffRequiredMixin, ListView):
+class CategoryListView(StaffRequiredMixin, KeysetPaginationMixin, ListView):
     """List all product categories"""
     model = Category
     template_name = 'cms/products/category_list.html'
@@ -870,7 +877,8 @@ class CategoryListView(StaffRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Category.objects.annotate(product_count=Count('products'))
+        # product_count is a maintained column: no per-request aggregation
+        queryset = Category.objects.all()
         
         # Search
         search_query = self.request.GET.get('search', '')
@@ -884,7 +892,7 @@ class CategoryListView(StaffRequiredMixin, ListView):
         elif status == 'inactive':
             queryset = queryset.filter(is_active=False)
         
-        return queryset.order_by('name')
+        return queryset.order_by('name', 'id')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -915,7 +923,7 @@ class CategoryUpdateView(StaffRequiredMixin, UpdateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['is_update'] = True
-        context['product_count'] = self.object.products.count()
+        context['product_count'] = self.object.product_count
         return context
 
     def form_valid(self, form):
@@ -976,35 +984,47 @@ def product_image_add(request, pk):
         # Get current image count for order calculation
         current_count = product.images.count()
 
-        uploaded_count = 0
-        try:
-            for i, image in enumerate(images):
-                # Create product image
-                product_image = ProductImage(
-                    product=product,
-                    image=image,
-                    alt_text=alt_text if alt_text else product.name,
-                    order=current_count + i
-                )
-
+        # Store the files and queue them; resizing runs in the background
+        # (see products.processing)
+        product_images = [
+            ProductImage(
+                product=product,
+                image=image,
+                alt_text=alt_text if alt_text else product.name,
+                order=current_count + i,
                 # Set first image as primary if requested and no primary exists
-                if i == 0 and set_as_primary and not has_primary:
-                    product_image.is_primary = True
-                    has_primary = True
+                is_primary=(i == 0 and set_as_primary and not has_primary),
+            )
+            for i, image in enumerate(images)
+        ]
 
-                product_image.save()
-                uploaded_count += 1
+        try:
+            with transaction.atomic():
+                ProductImage.objects.bulk_create(product_images)
+                product.update_primary_image()
+                purge_catalog_pages({product.category_id}, {product.slug})
+                schedule_image_processing(image.pk for image in product_images)
 
+            uploaded_count = len(product_images)
             if uploaded_count == 1:
-                messages.success(request, 'Image uploaded successfully!')
+                messages.success(request, 'Image uploaded successfully! It is being processed.')
             else:
-                messages.success(request, f'{uploaded_count} images uploaded successfully!')
+                messages.success(request, f'{uploaded_count} images uploaded successfully! They are being processed.')
         except Exception as e:
             messages.error(request, f'Error uploading images: {str(e)}')
 
     return redirect('cms:product_edit', pk=pk)
 
 
+def product_image_status(request, pk):
+    """Processing status of a product's images, polled by the edit page"""
+    if not request.user.is_staff:
+        return redirect('cms:login')
+
+    images = ProductImage.objects.filter(product_id=pk).values('pk', 'status', 'processing_error')
+    return JsonResponse({'images': list(images)})
+
+
 def product_image_set_primary(request, pk):
     """Set a product image as primary"""
     if not request.user.is_staff:
@@ -1017,9 +1037,11 @@ def product_image_set_primary(request, pk):
         # Remove primary status from all images of this product
         product.images.update(is_primary=False)
 
-        # Set this image as primary
-        image.is_primary = True
-        image.save()
+        # Set this image as primary; update() leaves the columns the
+        # processing worker writes alone
+        ProductImage.objects.filter(pk=image.pk).update(is_primary=True)
+        product.update_primary_image()
+        purge_catalog_pages({product.category_id}, {product.slug})
 
         messages.success(request, 'Primary image updated successfully!')
 
@@ -1030,7 +1052,7 @@ def product_image_set_primary(request, pk):
 # Inquiry Management - Contact Messages
 # ========================================
 
-class ContactMessageListView(StaffRequiredMixin, ListView):
+class ContactMessageListView(StaffRequiredMixin, KeysetPaginationMixin, ListView):
     """List all contact messages with filtering"""
     model = ContactMessage
     template_name = 'cms/inquiries/contact_message_list.html'
@@ -1038,35 +1060,13 @@ class ContactMessageListView(StaffRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = ContactMessage.objects.all()
-
-        # Search by name or email
-        search_query = self.request.GET.get('search', '')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(business_name__icontains=search_query)
-            )
-
-        # Filter by status
-        status = self.request.GET.get('status', '')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        # Filter by subject
-        subject = self.request.GET.get('subject', '')
-        if subject:
-            queryset = queryset.filter(subject=subject)
+        return exports.filter_contact_messages(self.request.GET)
 
-        # Filter by read status
-        is_read = self.request.GET.get('is_read', '')
-        if is_read == 'yes':
-            queryset = queryset.filter(is_read=True)
-        elif is_read == 'no':
-            queryset = queryset.filter(is_read=False)
-
-        return queryset.order_by('-created_at')
+    def estimate_count(self):
+        # Unfiltered, the cached stats have the exact total
+        if not any(self.request.GET.get(name) for name in ('search', 'status', 'subject', 'is_read', 'replied')):
+            return inquiry_stats(ContactMessage)['total']
+        return None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1074,16 +1074,14 @@ class ContactMessageListView(StaffRequiredMixin, ListView):
         context['selected_status'] = self.request.GET.get('status', '')
         context['selected_subject'] = self.request.GET.get('subject', '')
         context['selected_is_read'] = self.request.GET.get('is_read', '')
+        context['selected_replied'] = self.request.GET.get('replied', '')
+        context['selected_sort'] = self.request.GET.get('sort', '')
+        context['sort_choices'] = exports.SORT_CHOICES
         context['status_choices'] = ContactMessage.STATUS_CHOICES
         context['subject_choices'] = ContactMessage.SUBJECT_CHOICES
 
         # Statistics
-        context['stats'] = {
-            'total': ContactMessage.objects.count(),
-            'new': ContactMessage.objects.filter(status='new').count(),
-            'unread': ContactMessage.objects.filter(is_read=False).count(),
-            'contacted': ContactMessage.objects.filter(status='contacted').count(),
-        }
+        context['stats'] = inquiry_stats(ContactMessage)
 
         return context
 
@@ -1099,12 +1097,12 @@ class ContactMessageDetailView(StaffRequiredMixin, TemplateView):
         # Mark as read when viewed
         if not message.is_read:
             message.is_read = True
-            message.save()
+            message.save(update_fields=['is_read', 'updated_at'])
 
         context['message'] = message
         context['reply_form'] = ContactMessageReplyForm(contact_message=message)
         context['status_form'] = ContactMessageStatusForm(instance=message)
-        context['replies'] = message.replies.all().order_by('-replied_at')
+        context['replies'] = message.replies.select_related('replied_by').order_by('-replied_at')
 
         return context
 
@@ -1139,13 +1137,14 @@ class ContactMessageDetailView(StaffRequiredMixin, TemplateView):
 
                 if result['success']:
                     # Update message status
+                    # Only the status: the reply counters were just updated in the database
                     if message.status == 'new':
                         message.status = 'contacted'
-                        message.save()
+                        message.save(update_fields=['status', 'updated_at'])
 
                     messages.success(
                         request,
-                        f'Reply sent successfully to {result["recipient"]} ({result["recipient_email"]})'
+                        f'Reply to {result["recipient"]} ({result["recipient_email"]}) queued for delivery'
                     )
                 else:
                     messages.error(request, f'Failed to send reply: {result["error"]}')
@@ -1173,7 +1172,7 @@ class ContactMessageDeleteView(StaffRequiredMixin, DeleteView):
 # Inquiry Management - Quote Requests
 # ========================================
 
-class QuoteRequestListView(StaffRequiredMixin, ListView):
+class QuoteRequestListView(StaffRequiredMixin, KeysetPaginationMixin, ListView):
     """List all quote requests with filtering"""
     model = QuoteRequest
     template_name = 'cms/inquiries/quote_request_list.html'
@@ -1181,45 +1180,27 @@ class QuoteRequestListView(StaffRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = QuoteRequest.objects.all()
-
-        # Search by name, email, or business name
-        search_query = self.request.GET.get('search', '')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(business_name__icontains=search_query) |
-                Q(reference_id__icontains=search_query)
-            )
-
-        # Filter by status
-        status = self.request.GET.get('status', '')
-        if status:
-            queryset = queryset.filter(status=status)
+        return exports.filter_quote_requests(self.request.GET)
 
-        # Filter by business type
-        business_type = self.request.GET.get('business_type', '')
-        if business_type:
-            queryset = queryset.filter(business_type=business_type)
-
-        return queryset.order_by('-created_at')
+    def estimate_count(self):
+        # Unfiltered, the cached stats have the exact total
+        if not any(self.request.GET.get(name) for name in ('search', 'status', 'business_type', 'replied')):
+            return inquiry_stats(QuoteRequest)['total']
+        return None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('search', '')
         context['selected_status'] = self.request.GET.get('status', '')
         context['selected_business_type'] = self.request.GET.get('business_type', '')
+        context['selected_replied'] = self.request.GET.get('replied', '')
+        context['selected_sort'] = self.request.GET.get('sort', '')
+        context['sort_choices'] = exports.SORT_CHOICES
         context['status_choices'] = QuoteRequest.STATUS_CHOICES
         context['business_type_choices'] = QuoteRequest.BUSINESS_TYPE_CHOICES
 
         # Statistics
-        context['stats'] = {
-            'total': QuoteRequest.objects.count(),
-            'new': QuoteRequest.objects.filter(status='new').count(),
-            'reviewing': QuoteRequest.objects.filter(status='reviewing').count(),
-            'quoted': QuoteRequest.objects.filter(status='quoted').count(),
-        }
+        context['stats'] = inquiry_stats(QuoteRequest)
 
         return context
 
@@ -1235,7 +1216,7 @@ class QuoteRequestDetailView(StaffRequiredMixin, TemplateView):
         context['quote'] = quote
         context['reply_form'] = QuoteRequestReplyForm(quote_request=quote)
         context['status_form'] = QuoteRequestStatusForm(instance=quote)
-        context['replies'] = quote.replies.all().order_by('-replied_at')
+        context['replies'] = quote.replies.select_related('replied_by').order_by('-replied_at')
 
         return context
 
@@ -1273,16 +1254,17 @@ class QuoteRequestDetailView(StaffRequiredMixin, TemplateView):
 
                 if result['success']:
                     # Update quote status
+                    # Only the status: the reply counters were just updated in the database
                     if quote.status == 'new':
                         quote.status = 'quoted'
-                        quote.save()
+                        quote.save(update_fields=['status', 'updated_at'])
                     elif quote.status == 'reviewing':
                         quote.status = 'quoted'
-                        quote.save()
+                        quote.save(update_fields=['status', 'updated_at'])
 
                     messages.success(
                         request,
-                        f'Quote sent successfully to {result["recipient"]} ({result["recipient_email"]})'
+                        f'Quote to {result["recipient"]} ({result["recipient_email"]}) queued for delivery'
                     )
                 else:
                     messages.error(request, f'Failed to send reply: {result["error"]}')
@@ -1310,142 +1292,107 @@ class QuoteRequestDeleteView(StaffRequiredMixin, DeleteView):
 # CSV Export Functions
 # ========================================
 
-def export_contact_messages_csv(request):
-    """Export contact messages to CSV"""
-    import csv
-    from django.http import HttpResponse
+def _csv_response(name, header, rows):
+    from django.http import StreamingHttpResponse
     from datetime import datetime
 
+    response = StreamingHttpResponse(exports.stream_csv(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    return response
+
+
+def export_contact_messages_csv(request):
+    """Export contact messages to CSV, streamed as it is read"""
     if not request.user.is_staff:
         return redirect('cms:login')
 
-    # Create the HttpResponse object with CSV header
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="contact_messages_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    # Respect the filters of the list view
+    queryset = exports.filter_contact_messages(request.GET)
+    rows = exports.export_rows(queryset, exports.contact_message_row)
+    return _csv_response('contact_messages', exports.CONTACT_MESSAGE_HEADER, rows)
 
-    writer = csv.writer(response)
 
-    # Write header
-    writer.writerow([
-        'ID', 'Date', 'Name', 'Email', 'Phone', 'Business Name',
-        'Subject', 'Message', 'Status', 'Is Read', 'Reply Count'
-    ])
+def export_quote_requests_csv(request):
+    """Export quote requests to CSV, streamed as it is read"""
+    if not request.user.is_staff:
+        return redirect('cms:login')
 
-    # Get filtered queryset (respect filters from request)
-    queryset = ContactMessage.objects.all()
+    # Respect the filters of the list view
+    queryset = exports.filter_quote_requests(request.GET)
+    rows = exports.export_rows(queryset, exports.quote_request_row)
+    return _csv_response('quote_requests', exports.QUOTE_REQUEST_HEADER, rows)
 
-    # Apply same filters as list view
-    search_query = request.GET.get('search', '')
-    if search_query:
-        queryset = queryset.filter(
-            Q(name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(business_name__icontains=search_query)
-        )
 
-    status = request.GET.get('status', '')
-    if status:
-        queryset = queryset.filter(status=status)
-
-    subject = request.GET.get('subject', '')
-    if subject:
-        queryset = queryset.filter(subject=subject)
-
-    is_read = request.GET.get('is_read', '')
-    if is_read == 'yes':
-        queryset = queryset.filter(is_read=True)
-    elif is_read == 'no':
-        queryset = queryset.filter(is_read=False)
-
-    queryset = queryset.order_by('-created_at')
-
-    # Write data rows
-    for msg in queryset:
-        writer.writerow([
-            msg.id,
-            msg.created_at.strftime('%Y-%m-%d %H:%M'),
-            msg.name,
-            msg.email,
-            msg.phone or '',
-            msg.business_name or '',
-            msg.get_subject_display(),
-            msg.message,
-            msg.get_status_display(),
-            'Yes' if msg.is_read else 'No',
-            msg.replies.count()
-        ])
+# ========================================
+# Background Export Jobs
+# ========================================
 
-    return response
+class ExportJobListView(StaffRequiredMixin, ListView):
+    """Start background exports and download their files"""
+    model = ExportJob
+    template_name = 'cms/exports/export_jobs.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
 
+    def get_queryset(self):
+        return ExportJob.objects.select_related('created_by')
 
-def export_quote_requests_csv(request):
-    """Export quote requests to CSV"""
-    import csv
-    from django.http import HttpResponse
-    from datetime import datetime
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Started from a CMS list: export what that list shows
+        context['filters'] = {
+            name: value for name, value in self.request.GET.items() if name not in ('kind', 'page') and value
+        }
+        context['form'] = kwargs.get('form') or ExportJobForm(initial={'kind': self.request.GET.get('kind')})
+        return context
+
+    def post(self, request, *args, **kwargs):
+        form = ExportJobForm(request.POST)
+        if not form.is_valid():
+            self.object_list = self.get_queryset()
+            messages.error(request, 'Please correct the form errors.')
+            return self.render_to_response(self.get_context_data(form=form))
+
+        job = form.save(commit=False)
+        job.created_by = request.user
+        job.filters = {
+            name[len('filter_'):]: value for name, value in request.POST.items()
+            if name.startswith('filter_') and value
+        }
+        job.save()
+        schedule_export_job(job.pk)
+        messages.success(request, f'{job.get_kind_display()} export started. It can be downloaded here when ready.')
+        return redirect('cms:export_jobs')
 
+
+def export_job_status(request):
+    """Progress of export jobs, polled by the export page"""
     if not request.user.is_staff:
         return redirect('cms:login')
 
-    # Create the HttpResponse object with CSV header
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="quote_requests_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-
-    writer = csv.writer(response)
-
-    # Write header
-    writer.writerow([
-        'Reference ID', 'Date', 'Name', 'Email', 'Phone', 'Business Name', 'Business Type',
-        'Product Type', 'Quantity', 'Budget Range', 'Custom Branding', 'Sample Order',
-        'Delivery State', 'Delivery City', 'Order Frequency', 'Status', 'Reply Count'
-    ])
-
-    # Get filtered queryset (respect filters from request)
-    queryset = QuoteRequest.objects.all()
-
-    # Apply same filters as list view
-    search_query = request.GET.get('search', '')
-    if search_query:
-        queryset = queryset.filter(
-            Q(name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(business_name__icontains=search_query) |
-            Q(reference_id__icontains=search_query)
-        )
+    ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.isdigit()]
+    jobs = ExportJob.objects.filter(pk__in=ids)
+    return JsonResponse({
+        'jobs': [
+            {'pk': job.pk, 'status': job.status, 'progress': job.progress,
+             'processed': job.processed_rows, 'total': job.total_rows, 'error': job.error}
+            for job in jobs
+        ]
+    })
 
-    status = request.GET.get('status', '')
-    if status:
-        queryset = queryset.filter(status=status)
-
-    business_type = request.GET.get('business_type', '')
-    if business_type:
-        queryset = queryset.filter(business_type=business_type)
-
-    queryset = queryset.order_by('-created_at')
-
-    # Write data rows
-    for quote in queryset:
-        writer.writerow([
-            quote.reference_id,
-            quote.created_at.strftime('%Y-%m-%d %H:%M'),
-            quote.name,
-            quote.email,
-            quote.phone or '',
-            quote.business_name,
-            quote.get_business_type_display(),
-            quote.product_type or '',
-            quote.quantity or '',
-            quote.budget_range or '',
-            'Yes' if quote.need_custom_branding else 'No',
-            'Yes' if quote.sample_order_interest else 'No',
-            quote.delivery_state or '',
-            quote.delivery_city or '',
-            quote.order_frequency or '',
-            quote.get_status_display(),
-            quote.replies.count()
-        ])
 
-    return response
+def export_job_download(request, pk):
+    """Download the file of a finished export job"""
+    from django.http import FileResponse, Http404
+
+    if not request.user.is_staff:
+        return redirect('cms:login')
+
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.STATUS_DONE)
+    try:
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name)
+    except FileNotFoundError:
+        raise Http404('The export file no longer exists')
 
 
 # ========================================
@@ -1525,12 +1472,7 @@ class RefundPolicyView(StaffRequiredMixin, TemplateView):
 
 
 def theme_css(request):
-    """Serve dynamic theme CSS"""
-    from django.http import HttpResponse
-    from django.template.loader import render_to_string
-
-    theme = ThemeSettings.load()
-
-    css_content = render_to_string('cms/theme.css', {'theme': theme})
+    """Redirect to the compiled, fingerprinted theme stylesheet"""
+    from cms.theme import theme_css_url
 
-    return HttpResponse(css_content, content_type='text/css')
+    return redirect(theme_css_url(ThemeSettings.load()))
@@ -0,0 +1,32 @@
+"""
+Template filter for on-demand thumbnails
+"""
+from django import template
+from django.conf import settings
+from django.urls import reverse
+
+from core.thumbnails import source_path
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(file, size):
+    """
+    URL of a resized copy of an uploaded image; a side of 0 keeps the ratio.
+    Only sizes listed in THUMBNAIL_SIZES are generated; others get the original.
+    Usage: {{ image.image|thumbnail:"400x300" }} or {{ category.icon|thumbnail:"64x0" }}
+    """
+    if not file:
+        return ''
+    if size not in settings.THUMBNAIL_SIZES:
+        return file.url
+    try:
+        width, height = (int(side) for side in size.split('x'))
+        stat = source_path(file.name).stat()
+    except (ValueError, OSError):
+        return file.url
+
+    url = reverse('core:thumbnail', kwargs={'width': width, 'height': height, 'path': file.name})
+    # Versioned so the immutable response is refetched if the file is replaced
+    return f'{url}?v={stat.st_mtime_ns:x}'
@@ -0,0 +1,109 @@
+"""
+On-demand thumbnails of uploaded images
+
+``/media/thumb/<w>x<h>/<path>`` resizes an uploaded image the first time a
+size is requested. Both sides given: the image is cropped to fill the box;
+a side of 0: that side follows the aspect ratio. Images are never enlarged.
+
+Results are cached on disk under THUMBNAIL_ROOT, named by a hash of the
+source file's identity (path, size, mtime) and the requested size, so a
+replaced source never serves a stale thumbnail. A file lock per hash
+prefix keeps concurrent requests, in any worker, from generating the same
+thumbnail twice.
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+
+# Upload directories of ProductImage, Category.icon, HeroSection and MediaFile
+SOURCE_DIRS = ('products/', 'categories/', 'cms/hero/', 'cms/media/')
+
+# source extension -> (Pillow format, thumbnail extension, save options)
+FORMATS = {
+    '.jpg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    '.jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    '.png': ('PNG', '.png', {'optimize': True}),
+    '.gif': ('PNG', '.png', {'optimize': True}),
+    '.webp': ('WEBP', '.webp', {'quality': 80, 'method': 6}),
+}
+
+CONTENT_TYPES = {'.jpg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+
+def source_path(name):
+    """
+    Absolute path of an uploaded image thumbnails may be made from.
+    Raises FileNotFoundError for anything else.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    if not name.startswith(SOURCE_DIRS) or extension not in FORMATS:
+        raise FileNotFoundError(name)
+    # safe_join rejects paths escaping MEDIA_ROOT
+    path = Path(safe_join(settings.MEDIA_ROOT, name))
+    if not path.is_file():
+        raise FileNotFoundError(name)
+    return path
+
+
+def thumbnail_key(name, path, width, height):
+    stat = path.stat()
+    raw = f'{name}|{stat.st_size}|{stat.st_mtime_ns}|{width}x{height}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _resize(image, width, height):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('P', '1'):
+        # Palette images can only be resized with nearest-neighbour sampling
+        image = image.convert('RGBA')
+    if width and height:
+        size = (min(width, image.width), min(height, image.height))
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    if width:
+        size = (width, round(image.height * width / image.width))
+    else:
+        size = (round(image.width * height / image.height), height)
+    if size[0] >= image.width:
+        return image
+    return image.resize((max(1, size[0]), max(1, size[1])), Image.LANCZOS)
+
+
+def _render(source, target, width, height, image_format, options):
+    with Image.open(source) as image:
+        thumbnail = _resize(image, width, height)
+        if image_format == 'JPEG' and thumbnail.mode not in ('RGB', 'L'):
+            thumbnail = thumbnail.convert('RGB')
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            thumbnail.save(f, format=image_format, **options)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, target)
+
+
+def get_thumbnail(name, width, height):
+    """
+    Return ``(path, content_type)`` of the thumbnail of media file ``name``,
+    generating it if needed.
+    """
+    source = source_path(name)
+    image_format, extension, options = FORMATS[os.path.splitext(name)[1].lower()]
+    key = thumbnail_key(name, source, width, height)
+
+    root = Path(settings.THUMBNAIL_ROOT)
+    target = root / key[:2] / f'{key}{extension}'
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        (root / 'locks').mkdir(exist_ok=True)
+        with open(root / 'locks' / f'{key[:2]}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another request may have generated it while we waited
+            if not target.exists():
+                _render(source, target, width, height, image_format, options)
+    return target, CONTENT_TYPES[extension]
@@ -8,6 +8,8 @@ urlpatterns = [
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
     path('request-quote/', views.request_quote, name='request_quote'),
+    path('csrf-token/', views.csrf_token, name='csrf_token'),
+    path('media/thumb/<int:width>x<int:height>/<path:path>', views.thumbnail, name='thumbnail'),
 
     # Policy Pages
     path('privacy-policy/', views.privacy_policy, name='privacy_policy'),
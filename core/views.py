@@ -1,25 +1,54 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, JsonResponse
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.views.decorators.cache import never_cache
 from inquiries.models import ContactMessage, QuoteRequest
 from inquiries.forms import ContactForm, QuoteRequestForm
 from products.models import Product
-from cms.models import TextContent
+from cms.snapshots import load_page_content
+from cms.page_cache import cache_public_page
+from PIL import Image
+from .thumbnails import get_thumbnail
 
 
+@cache_public_page('cms:home', 'products')
 def home(request):
     """Home page view"""
     featured_products = Product.objects.filter(is_featured=True, is_active=True)[:6]
     context = {
+        'cms_page': 'home',
         'featured_products': featured_products,
     }
     return render(request, 'core/home.html', context)
 
 
+@cache_public_page('cms:about')
 def about(request):
     """About page view"""
-    return render(request, 'core/about.html')
+    return render(request, 'core/about.html', {'cms_page': 'about'})
 
 
+def _defer_csrf_token(form):
+    """
+    Leave the CSRF token out of a public form so its page can be cached
+    for everyone; the token is fetched from core:csrf_token on submit.
+    """
+    form.helper.disable_csrf = True
+    form.helper.attrs['data-csrf-url'] = reverse('core:csrf_token')
+    return form
+
+
+@never_cache
+def csrf_token(request):
+    """CSRF token for forms on cached pages (also sets the CSRF cookie)"""
+    return JsonResponse({'token': get_token(request)})
+
+
+@cache_public_page('cms:contact')
 def contact(request):
     """Contact page view with form"""
     if request.method == 'POST':
@@ -31,10 +60,11 @@ def contact(request):
     else:
         form = ContactForm()
 
-    context = {'form': form}
+    context = {'cms_page': 'contact', 'form': _defer_csrf_token(form)}
     return render(request, 'core/contact.html', context)
 
 
+@cache_public_page('cms:request-quote')
 def request_quote(request):
     """Request quote page view with detailed form"""
     if request.method == 'POST':
@@ -50,35 +80,44 @@ def request_quote(request):
     else:
         form = QuoteRequestForm()
 
-    context = {'form': form}
+    context = {'cms_page': 'request-quote', 'form': _defer_csrf_token(form)}
     return render(request, 'core/request_quote.html', context)
 
 
+@cache_public_page('cms:policies')
 def privacy_policy(request):
     """Privacy Policy page view"""
-    policy = TextContent.objects.filter(
-        page_name='policies',
-        section_identifier='privacy-policy'
-    ).first()
+    policy = load_page_content('policies').get_text_by_section('privacy-policy')
     context = {'policy': policy}
     return render(request, 'policies/privacy_policy.html', context)
 
 
+@cache_public_page('cms:policies')
 def terms_conditions(request):
     """Terms & Conditions page view"""
-    policy = TextContent.objects.filter(
-        page_name='policies',
-        section_identifier='terms-conditions'
-    ).first()
+    policy = load_page_content('policies').get_text_by_section('terms-conditions')
     context = {'policy': policy}
     return render(request, 'policies/terms_conditions.html', context)
 
 
+@cache_public_page('cms:policies')
 def refund_policy(request):
     """Refund Policy page view"""
-    policy = TextContent.objects.filter(
-        page_name='policies',
-        section_identifier='refund-policy'
-    ).first()
+    policy = load_page_content('policies').get_text_by_section('refund-policy')
     context = {'policy': policy}
     return render(request, 'policies/refund_policy.html', context)
+
+
+def thumbnail(request, width, height, path):
+    """Resized copy of an uploaded image, generated on first request"""
+    if f'{width}x{height}' not in settings.THUMBNAIL_SIZES:
+        raise Http404('Unsupported thumbnail size')
+    try:
+        target, content_type = get_thumbnail(path, width, height)
+    except (OSError, SuspiciousFileOperation, Image.DecompressionBombError):
+        raise Http404('No such image')
+
+    response = FileResponse(open(target, 'rb'), content_type=content_type)
+    # Thumbnail URLs carry a version of the source file (see the thumbnail filter)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from .models import ContactMessage, Inquiry, QuoteRequest
+from .stats import invalidate_stats
 
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'subject', 'status', 'is_read', 'created_at']
+    list_display = ['name', 'email', 'subject', 'status', 'is_read', 'reply_count', 'created_at']
     list_filter = ['status', 'is_read', 'subject', 'created_at']
     search_fields = ['name', 'email', 'phone', 'business_name', 'message']
     readonly_fields = ['created_at', 'updated_at']
@@ -33,21 +34,25 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
     def mark_as_read(self, request, queryset):
         queryset.update(is_read=True)
+        invalidate_stats(ContactMessage)
         self.message_user(request, f'{queryset.count()} messages marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
 
     def mark_as_unread(self, request, queryset):
         queryset.update(is_read=False)
+        invalidate_stats(ContactMessage)
         self.message_user(request, f'{queryset.count()} messages marked as unread.')
     mark_as_unread.short_description = 'Mark selected as unread'
 
     def mark_as_contacted(self, request, queryset):
         queryset.update(status='contacted')
+        invalidate_stats(ContactMessage)
         self.message_user(request, f'{queryset.count()} messages marked as contacted.')
     mark_as_contacted.short_description = 'Mark as contacted'
 
     def mark_as_closed(self, request, queryset):
         queryset.update(status='closed')
+        invalidate_stats(ContactMessage)
         self.message_user(request, f'{queryset.count()} messages marked as closed.')
     mark_as_closed.short_description = 'Mark as closed'
 
@@ -102,7 +107,7 @@ class InquiryAdmin(admin.ModelAdmin):
 
 @admin.register(QuoteRequest)
 class QuoteRequestAdmin(admin.ModelAdmin):
-    list_display = ['reference_id', 'business_name', 'name', 'business_type', 'status', 'created_at']
+    list_display = ['reference_id', 'business_name', 'name', 'business_type', 'status', 'reply_count', 'created_at']
     list_filter = ['status', 'business_type', 'custom_branding_required', 'sample_order_first', 'created_at']
     search_fields = ['reference_id', 'name', 'business_name', 'email', 'phone', 'delivery_city', 'gst_number']
     readonly_fields = ['reference_id', 'created_at', 'updated_at']
@@ -158,30 +163,36 @@ class QuoteRequestAdmin(admin.ModelAdmin):
 
     def mark_as_reviewing(self, request, queryset):
         queryset.update(status='reviewing')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as under review.')
     mark_as_reviewing.short_description = 'Mark as under review'
 
     def mark_as_quoted(self, request, queryset):
         queryset.update(status='quoted')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as quoted.')
     mark_as_quoted.short_description = 'Mark as quote sent'
 
     def mark_as_negotiating(self, request, queryset):
         queryset.update(status='negotiating')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as in negotiation.')
     mark_as_negotiating.short_description = 'Mark as in negotiation'
 
     def mark_as_accepted(self, request, queryset):
         queryset.update(status='accepted')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as accepted.')
     mark_as_accepted.short_description = 'Mark as accepted'
 
     def mark_as_rejected(self, request, queryset):
         queryset.update(status='rejected')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as rejected.')
     mark_as_rejected.short_description = 'Mark as rejected'
 
     def mark_as_closed(self, request, queryset):
         queryset.update(status='closed')
+        invalidate_stats(QuoteRequest)
         self.message_user(request, f'{queryset.count()} quote requests marked as closed.')
     mark_as_closed.short_description = 'Mark as closed'
@@ -1,10 +1,10 @@
 """
 Email utility functions for sending inquiry replies
 """
-from django.core.mail import EmailMessage, get_connection
 from django.conf import settings as django_settings
 from cms.models import SiteSettings
 from .models import InquiryReply, ContactMessage, QuoteRequest
+from . import outbox, smtp_pool
 
 
 def get_email_config():
@@ -40,7 +40,7 @@ def send_inquiry_reply(
     attachment_file=None
 ):
     """
-    Send an email reply to a contact message or quote request
+    Queue an email reply to a contact message or quote request
 
     Parameters:
     - inquiry_type: 'contact' or 'quote'
@@ -51,7 +51,7 @@ def send_inquiry_reply(
     - attachment_file: File object to attach (optional)
 
     Returns:
-    - Dictionary with success status and InquiryReply object
+    - Dictionary with success status (the reply was queued) and InquiryReply object
     """
     # Get email configuration
     email_config = get_email_config()
@@ -103,17 +103,7 @@ def send_inquiry_reply(
     # Add signature to message
     full_message = f"{message}\n\n{email_config['signature']}"
 
-    # Create email connection
-    connection = get_connection(
-        host=email_config['host'],
-        port=email_config['port'],
-        username=email_config['username'],
-        password=email_config['password'],
-        use_tls=email_config['use_tls'],
-        fail_silently=False,
-    )
-
-    # Create InquiryReply record (before sending)
+    # The reply record is the outbox entry; it is sent in the background
     reply_record = InquiryReply(
         inquiry_type=inquiry_type,
         contact_message=contact_message,
@@ -130,53 +120,15 @@ def send_inquiry_reply(
     if attachment_file:
         reply_record.attachment = attachment_file
 
-    # Save reply record (will have email_sent_successfully=False initially)
-    reply_record.save()
-
-    # Try to send email
-    try:
-        email = EmailMessage(
-            subject=subject,
-            body=full_message,
-            from_email=email_config['username'],
-            to=[recipient_email],
-            connection=connection,
-        )
-
-        # Attach file if provided and already saved
-        if attachment_file and reply_record.attachment:
-            email.attach_file(reply_record.attachment.path)
-
-        # Send the email
-        email.send()
-
-        # Update reply record as successful
-        reply_record.email_sent_successfully = True
-        reply_record.save()
-
-        # Mark contact message as read if it's a contact inquiry
-        if contact_message:
-            contact_message.is_read = True
-            contact_message.save()
-
-        return {
-            'success': True,
-            'error': None,
-            'reply_record': reply_record,
-            'recipient': recipient_name,
-            'recipient_email': recipient_email
-        }
-
-    except Exception as e:
-        # Update reply record with error
-        reply_record.error_message = str(e)
-        reply_record.save()
+    outbox.enqueue(reply_record)
 
-        return {
-            'success': False,
-            'error': f'Failed to send email: {str(e)}',
-            'reply_record': reply_record
-        }
+    return {
+        'success': True,
+        'error': None,
+        'reply_record': reply_record,
+        'recipient': recipient_name,
+        'recipient_email': recipient_email
+    }
 
 
 def test_email_configuration():
@@ -190,16 +142,8 @@ def test_email_configuration():
         return (False, "Email settings not configured in CMS")
 
     try:
-        connection = get_connection(
-            host=email_config['host'],
-            port=email_config['port'],
-            username=email_config['username'],
-            password=email_config['password'],
-            use_tls=email_config['use_tls'],
-            fail_silently=False,
-        )
-        connection.open()
-        connection.close()
+        # Reuses (and keeps) the connection the outbox sends with
+        smtp_pool.get_pool(email_config).check()
         return (True, "Email configuration is valid")
     except Exception as e:
         return (False, f"Email configuration error: {str(e)}")
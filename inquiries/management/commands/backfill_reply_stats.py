@@ -0,0 +1,18 @@
+"""
+Management command to recompute the reply statistics of inquiries
+"""
+from django.core.management.base import BaseCommand
+from inquiries.models import ContactMessage, QuoteRequest, refresh_reply_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes reply_count, first_response_at and last_replied_at of contact '
+        'messages and quote requests from their replies, e.g. after bulk imports.'
+    )
+
+    def handle(self, *args, **options):
+        for model in (ContactMessage, QuoteRequest):
+            refresh_reply_stats(model.objects.all())
+            self.stdout.write(f'Updated {model._meta.verbose_name_plural}: {model.objects.count()}')
+        self.stdout.write(self.style.SUCCESS('Reply statistics are up to date'))
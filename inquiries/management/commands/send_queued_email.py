@@ -0,0 +1,58 @@
+"""
+Management command to deliver queued inquiry replies
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inquiries.models import InquiryReply
+from inquiries.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends the inquiry replies waiting in the outbox, retrying failed ones '
+        'with backoff. Run it from cron, or with --loop as a worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the outbox'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=15,
+            help='Seconds between polls with --loop (default: 15)'
+        )
+        parser.add_argument(
+            '--retry-dead',
+            action='store_true',
+            help='Queue replies that exhausted their attempts again'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            requeued = InquiryReply.objects.filter(delivery_status=InquiryReply.DELIVERY_DEAD).update(
+                delivery_status=InquiryReply.DELIVERY_QUEUED, attempts=0, next_attempt_at=timezone.now()
+            )
+            self.stdout.write(f'Queued {requeued} failed reply(s) again')
+
+        while True:
+            sent, failed = self.drain()
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} reply(s), {failed} failed'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def drain(self):
+        sent = failed = 0
+        while True:
+            batch_sent, batch_failed = process_outbox()
+            sent += batch_sent
+            failed += batch_failed
+            if not batch_sent and not batch_failed:
+                return sent, failed
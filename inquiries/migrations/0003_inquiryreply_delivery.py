@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:36
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_delivery_status(apps, schema_editor):
+    # Replies sent before the outbox were attempted once, synchronously
+    InquiryReply = apps.get_model('inquiries', 'InquiryReply')
+    InquiryReply.objects.filter(email_sent_successfully=True).update(
+        delivery_status='sent', attempts=1, sent_at=F('replied_at')
+    )
+    InquiryReply.objects.filter(email_sent_successfully=False).update(delivery_status='dead', attempts=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiries', '0002_inquiryreply'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiryreply',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inquiryreply',
+            name='delivery_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='inquiryreply',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='When the outbox tries (again) to send it', null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiryreply',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inquiryreply',
+            index=models.Index(fields=['delivery_status', 'next_attempt_at'], name='inquiryreply_outbox_idx'),
+        ),
+        migrations.RunPython(set_delivery_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:42
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_reply_stats(apps, schema_editor):
+    InquiryReply = apps.get_model('inquiries', 'InquiryReply')
+    for model_name, field in [('ContactMessage', 'contact_message'), ('QuoteRequest', 'quote_request')]:
+        replies = InquiryReply.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        apps.get_model('inquiries', model_name).objects.update(
+            reply_count=Coalesce(Subquery(replies.annotate(value=Count('pk')).values('value')), 0),
+            first_response_at=Subquery(replies.annotate(value=Min('replied_at')).values('value')),
+            last_replied_at=Subquery(replies.annotate(value=Max('replied_at')).values('value')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiries', '0003_inquiryreply_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='first_response_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='last_replied_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quoterequest',
+            name='first_response_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='quoterequest',
+            name='last_replied_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='quoterequest',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['reply_count', '-created_at'], name='contactmessage_replied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quoterequest',
+            index=models.Index(fields=['reply_count', '-created_at'], name='quoterequest_replied_idx'),
+        ),
+        migrations.RunPython(backfill_reply_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,41 @@
 from django.db import models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from products.models import Product
 
 
+def refresh_reply_stats(queryset):
+    """Recompute reply_count, first_response_at and last_replied_at of inquiries"""
+    replies = InquiryReply.objects.filter(
+        **{queryset.model.replies.field.name: OuterRef('pk')}
+    ).order_by().values(queryset.model.replies.field.name)
+
+    def aggregate(expression):
+        return Subquery(replies.annotate(value=expression).values('value'))
+
+    queryset.update(
+        reply_count=Coalesce(aggregate(Count('pk')), 0),
+        first_response_at=aggregate(Min('replied_at')),
+        last_replied_at=aggregate(Max('replied_at')),
+    )
+
+
+REPLY_STAT_FIELDS = ('reply_count', 'first_response_at', 'last_replied_at')
+
+
+def _save_without_reply_stats(instance, kwargs):
+    """
+    Leave the reply statistics out of updates: they are maintained in the
+    database (see inquiries.signals) and the values loaded with the object
+    may be stale.
+    """
+    if not instance._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+        kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in REPLY_STAT_FIELDS
+        ]
+
+
 class ContactMessage(models.Model):
     """General contact form submissions"""
     STATUS_CHOICES = [
@@ -50,6 +84,11 @@ class ContactMessage(models.Model):
     is_read = models.BooleanField(default=False)
     admin_notes = models.TextField(blank=True, help_text="Internal notes for admin use")
 
+    # Replies, maintained by the InquiryReply signals (see inquiries.signals)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    first_response_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_replied_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -58,10 +97,18 @@ class ContactMessage(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Contact Message'
         verbose_name_plural = 'Contact Messages'
+        indexes = [
+            models.Index(fields=['reply_count', '-created_at'], name='contactmessage_replied_idx'),
+            models.Index(fields=['-created_at', '-id'], name='contactmessage_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.get_subject_display()} ({self.created_at.strftime('%Y-%m-%d')})"
 
+    def save(self, *args, **kwargs):
+        _save_without_reply_stats(self, kwargs)
+        super().save(*args, **kwargs)
+
 
 class Inquiry(models.Model):
     """Product-specific inquiries from product detail pages"""
@@ -222,6 +269,11 @@ class QuoteRequest(models.Model):
     reference_id = models.CharField(max_length=20, unique=True, blank=True)
     admin_notes = models.TextField(blank=True)
 
+    # Replies, maintained by the InquiryReply signals (see inquiries.signals)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    first_response_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_replied_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -230,6 +282,10 @@ class QuoteRequest(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Quote Request'
         verbose_name_plural = 'Quote Requests'
+        indexes = [
+            models.Index(fields=['reply_count', '-created_at'], name='quoterequest_replied_idx'),
+            models.Index(fields=['-created_at', '-id'], name='quoterequest_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.business_name} - {self.name} ({self.created_at.strftime('%Y-%m-%d')})"
@@ -240,6 +296,7 @@ class QuoteRequest(models.Model):
             import random
             import string
             self.reference_id = 'QR' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        _save_without_reply_stats(self, kwargs)
         super().save(*args, **kwargs)
 
 
@@ -252,6 +309,18 @@ class InquiryReply(models.Model):
         ('quote', 'Quote Request'),
     ]
 
+    # Delivery states of the outbox (see inquiries.outbox)
+    DELIVERY_QUEUED = 'queued'
+    DELIVERY_SENDING = 'sending'
+    DELIVERY_SENT = 'sent'
+    DELIVERY_DEAD = 'dead'
+    DELIVERY_STATUS_CHOICES = [
+        (DELIVERY_QUEUED, 'Queued'),
+        (DELIVERY_SENDING, 'Sending'),
+        (DELIVERY_SENT, 'Sent'),
+        (DELIVERY_DEAD, 'Failed'),
+    ]
+
     # Link to inquiry
     inquiry_type = models.CharField(max_length=20, choices=INQUIRY_TYPE_CHOICES)
     contact_message = models.ForeignKey(
@@ -281,6 +350,12 @@ class InquiryReply(models.Model):
     email_sent_successfully = models.BooleanField(default=False)
     error_message = models.TextField(blank=True, help_text='Error message if email failed to send')
 
+    # Delivery
+    delivery_status = models.CharField(max_length=20, choices=DELIVERY_STATUS_CHOICES, default=DELIVERY_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text='When the outbox tries (again) to send it')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
     # Optional attachment
     attachment = models.FileField(upload_to='inquiry_replies/', blank=True, null=True, help_text='Optional file attachment (e.g., quote PDF)')
 
@@ -288,6 +363,9 @@ class InquiryReply(models.Model):
         verbose_name = 'Inquiry Reply'
         verbose_name_plural = 'Inquiry Replies'
         ordering = ['-replied_at']
+        indexes = [
+            models.Index(fields=['delivery_status', 'next_attempt_at'], name='inquiryreply_outbox_idx'),
+        ]
 
     def __str__(self):
         inquiry_ref = ''
@@ -0,0 +1,172 @@
+"""
+Outbox for inquiry reply emails
+
+Replying only records an InquiryReply in the ``queued`` state; the record
+is the outbox entry and, later, the delivery log. Queued replies are sent
+in batches over a pooled SMTP connection (see inquiries.smtp_pool) by
+``process_outbox``, which the ``send_queued_email`` command runs (from
+cron, or as a long-running worker) and which is also started on a
+background thread after each reply so mail normally leaves at once.
+
+The SMTP pool counts ``EMAIL_RATE_LIMIT_PER_MINUTE`` per process, so with
+a limit set web processes only queue replies and a single
+``send_queued_email --loop`` worker must do all the sending.
+
+A failed attempt is retried with exponential backoff; after
+``EMAIL_OUTBOX_MAX_ATTEMPTS`` attempts the reply is marked dead and its
+last error is shown in the CMS.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ContactMessage, InquiryReply
+from .smtp_pool import get_pool
+from .stats import invalidate_stats
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the first retry; doubled for every further attempt
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60 * 6
+
+# A reply left "sending" this long belongs to a worker that died
+SENDING_LEASE = timedelta(minutes=10)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def claim_due_replies(limit=50):
+    """
+    Mark up to ``limit`` replies that are due for delivery as sending and
+    return them. Each reply is claimed with a conditional update, so
+    concurrent workers never send the same reply twice.
+    """
+    now = timezone.now()
+    due = InquiryReply.objects.filter(
+        Q(delivery_status=InquiryReply.DELIVERY_QUEUED, next_attempt_at__lte=now)
+        | Q(delivery_status=InquiryReply.DELIVERY_SENDING, next_attempt_at__lte=now - SENDING_LEASE)
+    ).order_by('next_attempt_at', 'pk').values_list('pk', 'delivery_status', 'next_attempt_at')[:limit]
+
+    claimed = []
+    for pk, status, next_attempt_at in due:
+        if InquiryReply.objects.filter(
+            pk=pk, delivery_status=status, next_attempt_at=next_attempt_at
+        ).update(delivery_status=InquiryReply.DELIVERY_SENDING, next_attempt_at=now):
+            claimed.append(pk)
+    return list(InquiryReply.objects.filter(pk__in=claimed).order_by('next_attempt_at', 'pk'))
+
+
+def build_message(reply, email_config):
+    email = EmailMessage(
+        subject=reply.reply_subject,
+        body=reply.reply_message,
+        from_email=reply.reply_from or email_config['username'],
+        to=[reply.reply_to],
+    )
+    if reply.attachment:
+        email.attach_file(reply.attachment.path)
+    return email
+
+
+def mark_sent(reply):
+    reply.delivery_status = InquiryReply.DELIVERY_SENT
+    reply.email_sent_successfully = True
+    reply.attempts += 1
+    reply.sent_at = timezone.now()
+    reply.next_attempt_at = None
+    reply.error_message = ''
+    reply.save(update_fields=[
+        'delivery_status', 'email_sent_successfully', 'attempts', 'sent_at', 'next_attempt_at', 'error_message'
+    ])
+    # Mark contact message as read once it has been answered
+    if reply.contact_message_id:
+        ContactMessage.objects.filter(pk=reply.contact_message_id).update(is_read=True)
+        invalidate_stats(ContactMessage)
+
+
+def mark_failed(reply, error):
+    """Schedule a retry of a failed reply, or give up on it"""
+    reply.attempts += 1
+    reply.error_message = str(error)
+    if reply.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        reply.delivery_status = InquiryReply.DELIVERY_DEAD
+        reply.next_attempt_at = None
+        logger.error('Giving up on inquiry reply %s after %s attempts: %s', reply.pk, reply.attempts, error)
+    else:
+        reply.delivery_status = InquiryReply.DELIVERY_QUEUED
+        reply.next_attempt_at = timezone.now() + retry_delay(reply.attempts)
+        logger.warning('Sending inquiry reply %s failed (attempt %s): %s', reply.pk, reply.attempts, error)
+    reply.save(update_fields=['attempts', 'error_message', 'delivery_status', 'next_attempt_at'])
+
+
+def deliver(replies, email_config):
+    """Send claimed replies over the pooled connection; returns the number sent"""
+    messages = []
+    for reply in replies:
+        try:
+            messages.append((reply, build_message(reply, email_config)))
+        except Exception as e:
+            # e.g. the attachment is missing
+            mark_failed(reply, e)
+
+    results = get_pool(email_config).send_messages([message for reply, message in messages])
+    for (reply, message), error in zip(messages, results):
+        if error is None:
+            mark_sent(reply)
+        else:
+            mark_failed(reply, error)
+    return results.count(None)
+
+
+def process_outbox(limit=50):
+    """
+    Send the replies that are due. Returns ``(sent, failed)``; nothing is
+    claimed while the SMTP settings are missing.
+    """
+    from .email_utils import get_email_config
+
+    email_config = get_email_config()
+    if not email_config:
+        return 0, 0
+
+    if settings.EMAIL_RATE_LIMIT_PER_MINUTE:
+        # Claim no more than can be sent well within the claim's lease
+        limit = min(limit, settings.EMAIL_RATE_LIMIT_PER_MINUTE)
+    replies = claim_due_replies(limit)
+    sent = deliver(replies, email_config)
+    return sent, len(replies) - sent
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+
+
+def _process_in_background():
+    close_old_connections()
+    try:
+        process_outbox()
+    except Exception:
+        logger.exception('Processing the email outbox failed')
+    finally:
+        connection.close()
+
+
+def enqueue(reply):
+    """
+    Queue a new reply for delivery and, without a rate limit, try to send it
+    once the transaction commits
+    """
+    reply.delivery_status = InquiryReply.DELIVERY_QUEUED
+    reply.next_attempt_at = timezone.now()
+    reply.save()
+    if not settings.EMAIL_RATE_LIMIT_PER_MINUTE:
+        transaction.on_commit(lambda: _executor.submit(_process_in_background))
+    return reply
@@ -0,0 +1,46 @@
+"""
+Signal handlers for the inquiries app
+"""
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete
+
+from .models import ContactMessage, InquiryReply, QuoteRequest, refresh_reply_stats
+from .stats import invalidate_stats
+
+
+def _inquiries(reply):
+    """Querysets of the inquiries a reply answers"""
+    if reply.contact_message_id:
+        yield ContactMessage.objects.filter(pk=reply.contact_message_id)
+    if reply.quote_request_id:
+        yield QuoteRequest.objects.filter(pk=reply.quote_request_id)
+
+
+def count_saved_reply(sender, instance, created, **kwargs):
+    """Count a new reply on its inquiry in the same UPDATE, safe against concurrent replies"""
+    if not created or kwargs.get('raw'):
+        return
+    for inquiry in _inquiries(instance):
+        inquiry.update(
+            reply_count=F('reply_count') + 1,
+            first_response_at=Coalesce('first_response_at', Value(instance.replied_at, output_field=DateTimeField())),
+            last_replied_at=instance.replied_at,
+        )
+
+
+def count_deleted_reply(sender, instance, **kwargs):
+    for inquiry in _inquiries(instance):
+        refresh_reply_stats(inquiry)
+
+
+def inquiry_changed(sender, **kwargs):
+    invalidate_stats(sender)
+
+
+def connect_signals():
+    post_save.connect(count_saved_reply, sender=InquiryReply, dispatch_uid='inquiries.count_saved_reply')
+    post_delete.connect(count_deleted_reply, sender=InquiryReply, dispatch_uid='inquiries.count_deleted_reply')
+    for model in (ContactMessage, QuoteRequest):
+        for signal in (post_save, post_delete):
+            signal.connect(inquiry_changed, sender=model, dispatch_uid=f'inquiries.{model.__name__}_changed')
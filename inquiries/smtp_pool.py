@@ -0,0 +1,161 @@
+"""
+Long-lived SMTP connections for outgoing mail
+
+Each process keeps one open connection per SiteSettings email
+configuration and sends every message over it, so a batch of replies costs
+a single TLS handshake and login. The connection is reopened when it has
+been idle long enough for the server to have dropped it, and once more
+when a send finds it disconnected. Editing the SMTP settings changes the
+key, which closes the old connection.
+
+Sends are throttled to ``EMAIL_RATE_LIMIT_PER_MINUTE`` messages per minute
+(0: unlimited), counted per process. The limit holds for the site only
+because, when it is set, web processes do not send (see inquiries.outbox)
+and a single ``send_queued_email`` worker does.
+"""
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Servers commonly drop connections idle for a few minutes
+IDLE_TIMEOUT = 60
+
+RATE_WINDOW = 60
+
+
+def config_key(email_config):
+    return (
+        email_config['host'], email_config['port'], email_config['username'],
+        email_config['password'], email_config['use_tls'],
+    )
+
+
+class SMTPPool:
+    """An SMTP connection shared by every send using one configuration"""
+
+    def __init__(self, email_config):
+        self.email_config = email_config
+        self.backend = None
+        self.last_used = 0.0
+        self.sent_at = deque()
+        self.lock = threading.Lock()
+
+    def _open(self):
+        self.close()
+        backend = get_connection(
+            host=self.email_config['host'],
+            port=self.email_config['port'],
+            username=self.email_config['username'],
+            password=self.email_config['password'],
+            use_tls=self.email_config['use_tls'],
+            fail_silently=False,
+        )
+        backend.open()
+        self.backend = backend
+
+    def _connection(self):
+        if self.backend is None or time.monotonic() - self.last_used > IDLE_TIMEOUT:
+            self._open()
+        self.last_used = time.monotonic()
+        return self.backend
+
+    def close(self):
+        if self.backend is not None:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
+            self.backend = None
+
+    def _wait_for_slot(self):
+        """Reserve a send within the rate limit, sleeping without the lock until one is free"""
+        limit = settings.EMAIL_RATE_LIMIT_PER_MINUTE
+        if not limit:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.sent_at and now - self.sent_at[0] >= RATE_WINDOW:
+                    self.sent_at.popleft()
+                if len(self.sent_at) < limit:
+                    self.sent_at.append(now)
+                    return
+                wait = RATE_WINDOW - (now - self.sent_at[0])
+            # Released, so check() and other senders are not held up meanwhile
+            time.sleep(max(0.0, wait))
+
+    def _send(self, message):
+        message.connection = self._connection()
+        try:
+            self.backend.send_messages([message])
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server closed the connection since its last use
+            logger.info('SMTP connection to %s lost, reconnecting', self.email_config['host'])
+            self._open()
+            message.connection = self.backend
+            self.backend.send_messages([message])
+
+    def send_messages(self, messages):
+        """
+        Send messages over the shared connection. Returns one result per
+        message: None when it was sent, else the exception it failed with.
+        Messages go out one ``send_messages()`` call at a time so a refused
+        recipient only fails its own message.
+        """
+        results = []
+        for i, message in enumerate(messages):
+            self._wait_for_slot()
+            with self.lock:
+                try:
+                    self._send(message)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    results.append(e)
+                except Exception as e:
+                    # The server is unreachable or rejects the login: the
+                    # remaining messages would fail the same way
+                    self.close()
+                    results += [e] * (len(messages) - i)
+                    break
+                else:
+                    results.append(None)
+                finally:
+                    self.last_used = time.monotonic()
+        return results
+
+    def check(self):
+        """Open (or reuse) the connection; raises if the server cannot be reached or logged in to"""
+        with self.lock:
+            if self.backend is not None:
+                try:
+                    if self.backend.connection.noop()[0] == 250:
+                        self.last_used = time.monotonic()
+                        return
+                except Exception:
+                    pass
+            self._open()
+            self.last_used = time.monotonic()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(email_config):
+    """This process's pool for an email configuration"""
+    key = config_key(email_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # The settings changed: drop connections made with the old ones
+            for old in _pools.values():
+                old.close()
+            _pools.clear()
+            pool = _pools[key] = SMTPPool(email_config)
+    return pool
@@ -0,0 +1,56 @@
+"""
+Inquiry counts for the CMS
+
+Each model's counts come from one conditional-aggregate query and are kept
+in the shared cache for ``STATS_TIMEOUT`` seconds. Saving or deleting an
+inquiry drops the cached counts once the transaction commits (see
+inquiries.signals). Bulk ``update()`` calls send no signals, so their
+callers (the outbox, the admin actions) call ``invalidate_stats``
+themselves.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import ContactMessage, QuoteRequest
+
+
+STATS_TIMEOUT = 60
+
+# name -> filter of the rows counted; None counts every row
+STATS = {
+    ContactMessage: {
+        'total': None,
+        'new': Q(status='new'),
+        'unread': Q(is_read=False),
+        'contacted': Q(status='contacted'),
+    },
+    QuoteRequest: {
+        'total': None,
+        'new': Q(status='new'),
+        'reviewing': Q(status='reviewing'),
+        'quoted': Q(status='quoted'),
+    },
+}
+
+
+def _cache_key(model):
+    return f'inquiries:stats:{model._meta.model_name}'
+
+
+def inquiry_stats(model):
+    """Counts of ``model`` by the filters in STATS, e.g. ``{'total': 12, 'new': 3, ...}``"""
+    key = _cache_key(model)
+    stats = cache.get(key)
+    if stats is None:
+        stats = model.objects.order_by().aggregate(**{
+            name: Count('pk', filter=condition) for name, condition in STATS[model].items()
+        })
+        cache.set(key, stats, STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_stats(*models):
+    """Drop the cached counts of ``models`` (default: all) once the current transaction commits"""
+    keys = [_cache_key(model) for model in models or STATS]
+    transaction.on_commit(lambda: cache.delete_many(keys))
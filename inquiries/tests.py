@@ -1,3 +1,55 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import outbox
+from .models import InquiryReply
+
+
+class RetryDelayTests(TestCase):
+    def test_delay_doubles_until_capped(self):
+        delays = [outbox.retry_delay(attempts).total_seconds() for attempts in range(1, 5)]
+        self.assertEqual(delays, [outbox.RETRY_BASE_DELAY * 2 ** n for n in range(4)])
+        self.assertEqual(outbox.retry_delay(30), timedelta(seconds=outbox.RETRY_MAX_DELAY))
+
+
+class OutboxTests(TestCase):
+    def queue_reply(self, **kwargs):
+        return InquiryReply.objects.create(
+            inquiry_type='contact', reply_from='info@example.com', reply_to='customer@example.com',
+            reply_subject='Your inquiry', reply_message='Thank you',
+            next_attempt_at=timezone.now(), **kwargs
+        )
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+    def test_reply_is_dead_after_max_attempts(self):
+        reply = self.queue_reply()
+        outbox.mark_failed(reply, 'Connection refused')
+        outbox.mark_failed(reply, 'Connection refused')
+        self.assertEqual(reply.delivery_status, InquiryReply.DELIVERY_QUEUED)
+        self.assertGreater(reply.next_attempt_at, timezone.now())
+
+        outbox.mark_failed(reply, 'Connection refused')
+        reply.refresh_from_db()
+        self.assertEqual(reply.delivery_status, InquiryReply.DELIVERY_DEAD)
+        self.assertEqual((reply.attempts, reply.next_attempt_at), (3, None))
+        self.assertEqual(reply.error_message, 'Connection refused')
+        self.assertEqual(outbox.claim_due_replies(), [])
+
+    def test_reply_is_claimed_once(self):
+        reply = self.queue_reply()
+        self.assertEqual(outbox.claim_due_replies(), [reply])
+        # Still within the lease of the first claim
+        self.assertEqual(outbox.claim_due_replies(), [])
+
+        reply.refresh_from_db()
+        self.assertEqual(reply.delivery_status, InquiryReply.DELIVERY_SENDING)
+
+    def test_stale_claim_is_reclaimed(self):
+        reply = self.queue_reply(delivery_status=InquiryReply.DELIVERY_SENDING)
+        InquiryReply.objects.filter(pk=reply.pk).update(
+            next_attempt_at=timezone.now() - outbox.SENDING_LEASE - timedelta(minutes=1)
+        )
+        self.assertEqual(outbox.claim_due_replies(), [reply])
+        self.assertEqual(outbox.claim_due_replies(), [])
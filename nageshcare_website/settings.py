@@ -52,7 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files in production
+    'cms.middleware.ThemeWhiteNoiseMiddleware',  # WhiteNoise static files + compiled theme CSS
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -134,6 +134,10 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Compiled theme stylesheets (see cms/theme.py), served by WhiteNoise
+THEME_CSS_ROOT = BASE_DIR / 'theme_css'
+THEME_CSS_URL = STATIC_URL + 'theme/'
+
 # Media files (User uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -143,6 +147,51 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25 MB
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
 
+# Threads per worker that generate product image derivatives (see
+# products/processing.py); 0 processes uploads inside the request
+IMAGE_PROCESSING_WORKERS = config('IMAGE_PROCESSING_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+
+# On-demand thumbnails (see core/thumbnails.py)
+THUMBNAIL_ROOT = BASE_DIR / 'cache' / 'thumbnails'
+# Sizes ("<width>x<height>", 0 keeps the ratio) the thumbnail view generates;
+# any other size is a 404, so visitors cannot fill the disk with variants.
+# Add a size here before using it with the thumbnail filter.
+THUMBNAIL_SIZES = ['64x0', '400x300']
+
+# Background exports of inquiries (see cms/export_jobs.py); the files hold
+# customer details, so they live outside MEDIA_ROOT and are served to staff only
+EXPORT_ROOT = config('EXPORT_ROOT', default=str(BASE_DIR / 'exports'))
+EXPORT_RETENTION_DAYS = config('EXPORT_RETENTION_DAYS', default=30, cast=int)
+
+# Cache version stamps shared by all workers (see cms/cache_utils.py)
+CACHE_VERSION_DIR = BASE_DIR / 'cache' / 'versions'
+
+
+# Cache shared by all workers (file based: no extra service on shared hosting)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'django',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+# Anonymous full-page cache (see cms/page_cache.py); pages are purged on save
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Static export of the public pages (see cms/static_export.py). When a root
+# is set, saves queue the exported pages they affect for re-rendering on a
+# background thread; run `export_static_site --pending` from cron to catch up
+# after restarts.
+STATIC_EXPORT_ROOT = config('STATIC_EXPORT_ROOT', default='')
+STATIC_EXPORT_HOST = config(
+    'STATIC_EXPORT_HOST',
+    default=next((host.lstrip('.') for host in ALLOWED_HOSTS if host not in ('*', '')), 'localhost')
+)
+STATIC_EXPORT_COMPRESS = config('STATIC_EXPORT_COMPRESS', default=True, cast=bool)
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -168,6 +217,14 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='info@nageshcare.com')
 SERVER_EMAIL = config('SERVER_EMAIL', default='admin@nageshcare.com')
 
+# Inquiry replies are queued and sent by the outbox (see inquiries/outbox.py);
+# a reply is marked failed after this many attempts
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+
+# Messages per minute the SMTP provider accepts (0: no limit). With a limit,
+# replies are only sent by a single `send_queued_email --loop` worker
+EMAIL_RATE_LIMIT_PER_MINUTE = config('EMAIL_RATE_LIMIT_PER_MINUTE', default=0, cast=int)
+
 
 # Security Settings for Production
 if not DEBUG:
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from .models import Category, Product, ProductImage, ProductVariant, FragranceOption
+from .signals import purge_catalog_pages
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'is_active', 'created_at']
+    list_display = ['name', 'slug', 'active_product_count', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
@@ -76,23 +77,33 @@ class ProductAdmin(admin.ModelAdmin):
 
     actions = ['mark_as_featured', 'mark_as_not_featured', 'mark_as_active', 'mark_as_inactive']
 
+    def purge_cached_pages(self, queryset):
+        # queryset.update() sends no signals, so purge the cached pages here
+        purge_catalog_pages(set(queryset.values_list('category_id', flat=True)))
+
     def mark_as_featured(self, request, queryset):
         queryset.update(is_featured=True)
+        self.purge_cached_pages(queryset)
         self.message_user(request, f'{queryset.count()} products marked as featured.')
     mark_as_featured.short_description = 'Mark selected products as featured'
 
     def mark_as_not_featured(self, request, queryset):
         queryset.update(is_featured=False)
+        self.purge_cached_pages(queryset)
         self.message_user(request, f'{queryset.count()} products unmarked as featured.')
     mark_as_not_featured.short_description = 'Unmark selected products as featured'
 
     def mark_as_active(self, request, queryset):
         queryset.update(is_active=True)
+        Category.refresh_product_counts(set(queryset.values_list('category_id', flat=True)))
+        self.purge_cached_pages(queryset)
         self.message_user(request, f'{queryset.count()} products marked as active.')
     mark_as_active.short_description = 'Mark selected products as active'
 
     def mark_as_inactive(self, request, queryset):
         queryset.update(is_active=False)
+        Category.refresh_product_counts(set(queryset.values_list('category_id', flat=True)))
+        self.purge_cached_pages(queryset)
         self.message_user(request, f'{queryset.count()} products marked as inactive.')
     mark_as_inactive.short_description = 'Mark selected products as inactive'
 
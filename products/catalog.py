@@ -0,0 +1,30 @@
+"""
+Global catalog version
+
+A number in the shared cache that changes whenever a product, category,
+image, variant or fragrance changes. Per-worker structures built from the
+catalog (such as the suggestion index) compare it with the version they
+were built from to know when to rebuild.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Time-based, like the page cache's group versions: an evicted
+        # version is replaced by a newer one, never an older one
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Give the catalog a new version once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None))
@@ -0,0 +1,94 @@
+"""
+Responsive derivatives of product images
+
+Every ProductImage gets WebP and JPEG copies at a few standard widths,
+stored next to the original as ``products/{slug}/{name}-{width}w.{ext}``.
+They are re-encoded without EXIF data (the orientation is applied first)
+and recorded in ``ProductImage.derivatives`` for the ``product_picture``
+template tag.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+# Widths that match the catalog's card, gallery and full-width layouts
+WIDTHS = (320, 640, 960, 1280)
+
+# format -> (file extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_name(source_name, width, extension):
+    stem = posixpath.splitext(source_name)[0]
+    return f'{stem}-{width}w.{extension}'
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, options):
+    buffer = io.BytesIO()
+    # No exif= argument: the metadata of the upload is dropped
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(source_name, storage=default_storage):
+    """
+    Write the derivatives of an image file and return their description:
+    ``{'source', 'width', 'height', 'webp': {width: name}, 'jpeg': {...}}``.
+    Widths larger than the original are skipped; an image narrower than the
+    smallest width gets a single derivative at its own width. Raises OSError
+    for a file that cannot be decoded, including a decompression bomb.
+    """
+    with storage.open(source_name, 'rb') as f:
+        try:
+            image = Image.open(f)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        except Image.DecompressionBombError as e:
+            # Not an OSError, unlike Pillow's other decoding errors
+            raise OSError(f'{source_name} has too many pixels to process: {e}') from e
+
+    flat = _flatten(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.mode in ('LA', 'P') else 'RGB')
+
+    width, height = image.size
+    widths = [w for w in WIDTHS if w < width] or [width]
+    if widths[-1] != width and width <= WIDTHS[-1]:
+        widths.append(width)
+
+    result = {'source': source_name, 'width': width, 'height': height}
+    for key, (extension, options) in FORMATS.items():
+        result[key] = {}
+        for target in widths:
+            frame = image if key == 'webp' else flat
+            if target != width:
+                frame = frame.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            name = derivative_name(source_name, target, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            result[key][str(target)] = storage.save(name, ContentFile(_encode(frame, options)))
+    return result
+
+
+def delete_derivatives(derivatives, storage=default_storage):
+    """Remove the files listed in a ``derivatives`` description"""
+    for key in FORMATS:
+        for name in (derivatives or {}).get(key, {}).values():
+            storage.delete(name)
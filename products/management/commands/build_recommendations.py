@@ -0,0 +1,13 @@
+"""
+Management command to rebuild the related-product recommendations
+"""
+from django.core.management.base import BaseCommand
+from products.recommendations import rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recomputes related products from product text similarity'
+
+    def handle(self, *args, **options):
+        changed = rebuild_recommendations()
+        self.stdout.write(self.style.SUCCESS(f'Updated recommendations for {changed} product(s)'))
@@ -0,0 +1,44 @@
+"""
+Management command to process pending product images
+"""
+from django.core.management.base import BaseCommand
+from products.models import ProductImage
+from products.processing import process_image, reclaim_stale_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates the WebP/JPEG derivatives of pending product images, '
+        'e.g. uploads interrupted by a worker restart, and of images left '
+        'processing by a worker that died'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry images whose processing failed'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate the derivatives of every image'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            ProductImage.objects.update(status=ProductImage.STATUS_PENDING)
+        elif options['retry_failed']:
+            ProductImage.objects.filter(status=ProductImage.STATUS_FAILED).update(status=ProductImage.STATUS_PENDING)
+
+        reclaimed = reclaim_stale_images()
+        if reclaimed:
+            self.stdout.write(f'Reclaimed {reclaimed} image(s) left processing by a stopped worker')
+
+        pending = ProductImage.objects.filter(status=ProductImage.STATUS_PENDING).values_list('pk', flat=True)
+        results = [process_image(pk) for pk in list(pending)]
+
+        failed = results.count(ProductImage.STATUS_FAILED)
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {results.count(ProductImage.STATUS_READY)} image(s), {failed} failed'
+        ))
@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the product full-text search index
+"""
+from django.core.management.base import BaseCommand
+from products.models import Product
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for products'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Product.objects.count()} product(s)'))
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_listing_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+                "name, tagline, brand_name, category_name, short_description, features, full_description, "
+                "tokenize = 'porter unicode61 remove_diacritics 2')",
+                "INSERT INTO products_product_fts (products_product_fts, rank) "
+                "VALUES ('rank', 'bm25(10.0, 4.0, 6.0, 3.0, 2.0, 2.0, 1.0)')",
+                "INSERT INTO products_product_fts "
+                "(rowid, name, tagline, brand_name, category_name, short_description, features, full_description) "
+                "SELECT p.id, p.name, p.tagline, p.brand_name, c.name, p.short_description, p.features, p.full_description "
+                "FROM products_product p JOIN products_category c ON c.id = p.category_id",
+            ],
+            reverse_sql='DROP TABLE products_product_fts',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_primary_images(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    for product in Product.objects.all():
+        image = ProductImage.objects.filter(product=product).order_by('-is_primary', 'order', 'pk').first()
+        if image:
+            Product.objects.filter(pk=product.pk).update(primary_image=image)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.RunPython(set_primary_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+def mark_processed_images(apps, schema_editor):
+    ProductImage = apps.get_model('products', 'ProductImage')
+    for image in ProductImage.objects.all():
+        if image.derivatives.get('source') == image.image.name:
+            ProductImage.objects.filter(pk=image.pk).update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_productimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=20),
+        ),
+        migrations.RunPython(mark_processed_images, migrations.RunPython.noop),
+    ]
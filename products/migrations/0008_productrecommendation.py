@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_productimage_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to='products.product')),
+                ('related_ids', models.JSONField(default=list, help_text='Most similar products first')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
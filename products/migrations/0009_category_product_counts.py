@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+
+    def count(**filters):
+        products = Product.objects.filter(category=OuterRef('pk'), **filters)
+        return Coalesce(Subquery(products.values('category').annotate(n=Count('pk')).values('n')), 0)
+
+    Category.objects.update(product_count=count(), active_product_count=count(is_active=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_category_product_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-is_featured', '-created_at', '-id'], name='product_cms_listing_idx'),
+        ),
+    ]
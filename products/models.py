@@ -1,9 +1,13 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.urls import reverse
 import os
 from datetime import datetime
 
+from .images import build_derivatives, delete_derivatives
+
 
 class Category(models.Model):
     """Product categories - Personal Care, Wellness & Spiritual, etc."""
@@ -12,6 +16,9 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     icon = models.ImageField(upload_to='categories/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Maintained by the product save/delete signals (see products.signals)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -22,14 +29,33 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    COUNTER_FIELDS = ('product_count', 'active_product_count')
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # Writing back the counters loaded with this object would undo
+            # products added or removed since
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('products:category', kwargs={'slug': self.slug})
 
+    @classmethod
+    def refresh_product_counts(cls, category_ids=None):
+        """Recount the products of the given (default: all) categories"""
+        def count(**filters):
+            products = Product.objects.filter(category=OuterRef('pk'), **filters)
+            return Coalesce(Subquery(products.values('category').annotate(n=Count('pk')).values('n')), 0)
+
+        categories = cls.objects.all() if category_ids is None else cls.objects.filter(pk__in=category_ids)
+        categories.update(product_count=count(), active_product_count=count(is_active=True))
+
 
 class Product(models.Model):
     """Main product model for wholesale products"""
@@ -63,11 +89,26 @@ class Product(models.Model):
     meta_description = models.TextField(max_length=300, blank=True)
     meta_keywords = models.CharField(max_length=500, blank=True)
 
+    # Maintained by ProductImage (see update_primary_image), not edited directly
+    primary_image = models.ForeignKey(
+        'ProductImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # Keyset pagination of the public listing
+            models.Index(fields=['is_active', '-is_featured', '-created_at', '-id'], name='product_listing_idx'),
+            models.Index(fields=['-is_featured', '-created_at', '-id'], name='product_cms_listing_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -87,11 +128,17 @@ class Product(models.Model):
         return []
 
     def get_primary_image(self):
-        """Get the primary product image or first image"""
-        primary = self.images.filter(is_primary=True).first()
-        if primary:
-            return primary
-        return self.images.first()
+        """
+        Get the primary product image or first image.
+        Use select_related('primary_image') to avoid a query per product.
+        """
+        return self.primary_image
+
+    def update_primary_image(self):
+        """Point primary_image at the primary (or else the first) image"""
+        self.primary_image = self.images.order_by('-is_primary', 'order', 'pk').first()
+        # update() keeps updated_at and the product's save signals untouched
+        Product.objects.filter(pk=self.pk).update(primary_image=self.primary_image)
 
 
 def product_image_upload_path(instance, filename):
@@ -126,17 +173,77 @@ class ProductImage(models.Model):
     alt_text = models.CharField(max_length=200, blank=True)
     order = models.IntegerField(default=0, help_text="Display order")
 
+    # Responsive copies of the image, see products.images
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Derivatives are generated in the background, see products.processing
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, editable=False)
+    processing_error = models.TextField(blank=True, editable=False)
+    # When a worker claimed the image, to reclaim images whose worker died
+    processing_started_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['-is_primary', 'order']
 
     def __str__(self):
         return f"{self.product.name} - Image {self.id}"
 
+    # Written by the processing worker (see products.processing), not by saves
+    PROCESSING_FIELDS = ('derivatives', 'status', 'processing_error', 'processing_started_at')
+
     def save(self, *args, **kwargs):
         # If this is set as primary, unset other primary images for this product
         if self.is_primary:
             ProductImage.objects.filter(product=self.product, is_primary=True).update(is_primary=False)
+
+        # A new or replaced file is queued for processing by the post_save handler
+        if self._state.adding or kwargs.get('force_insert'):
+            if self.derivatives.get('source') != self.image.name:
+                self.status = self.STATUS_PENDING
+            self.needs_processing = self.status == self.STATUS_PENDING
+        elif kwargs.get('update_fields') is None:
+            stored_name = ProductImage.objects.filter(pk=self.pk).values_list('image', flat=True).first()
+            self.needs_processing = not self.image._committed or stored_name != self.image.name
+            # The worker may have finished since this object was loaded:
+            # only a replaced file resets its status
+            skipped = self.PROCESSING_FIELDS
+            if self.needs_processing:
+                self.status = self.STATUS_PENDING
+                self.processing_error = ''
+                skipped = ('derivatives', 'processing_started_at')
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        else:
+            self.needs_processing = False
         super().save(*args, **kwargs)
+        self.product.update_primary_image()
+
+    def update_derivatives(self):
+        """
+        Regenerate the responsive WebP/JPEG copies of the image.
+        Raises for files that cannot be decoded.
+        """
+        previous = self.derivatives
+        self.derivatives = build_derivatives(self.image.name)
+        self.status = self.STATUS_READY
+        self.processing_error = ''
+        ProductImage.objects.filter(pk=self.pk).update(
+            derivatives=self.derivatives, status=self.status, processing_error=''
+        )
+        if previous.get('source') != self.image.name:
+            delete_derivatives(previous)
 
 
 class ProductVariant(models.Model):
@@ -183,3 +290,18 @@ class FragranceOption(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - {self.name}"
+
+
+class ProductRecommendation(models.Model):
+    """Precomputed related products, see products.recommendations"""
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation'
+    )
+    related_ids = models.JSONField(default=list, help_text="Most similar products first")
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations for {self.product.name}"
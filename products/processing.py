@@ -0,0 +1,100 @@
+"""
+Background processing of product image uploads
+
+Uploads are stored and recorded as pending ProductImage rows inside the
+request. Decoding, validation and derivative generation then run on a
+per-worker thread pool once the transaction commits; Pillow releases the
+GIL while decoding, resizing and encoding, so the pool uses several cores.
+
+Images left pending by a restarted worker, or left processing past
+``PROCESSING_LEASE`` by one that died, are picked up by the
+``generate_image_derivatives`` command (suitable for cron).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+# An image left "processing" this long belongs to a worker that died
+PROCESSING_LEASE = timedelta(minutes=10)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='product-images'
+        )
+    return _executor
+
+
+def process_image(pk):
+    """
+    Validate an uploaded image and generate its derivatives.
+    Returns the resulting status, or None if the image was already claimed.
+    """
+    claimed = ProductImage.objects.filter(
+        pk=pk, status=ProductImage.STATUS_PENDING
+    ).update(status=ProductImage.STATUS_PROCESSING, processing_started_at=timezone.now())
+    if not claimed:
+        return None
+
+    image = ProductImage.objects.select_related('product').get(pk=pk)
+    try:
+        image.update_derivatives()
+    except Exception as e:
+        logger.warning('Processing product image %s failed: %s', pk, e)
+        image.status = ProductImage.STATUS_FAILED
+        ProductImage.objects.filter(pk=pk).update(status=image.status, processing_error=str(e))
+    else:
+        # The catalog pages can now use the derivatives
+        from .signals import purge_catalog_pages
+        purge_catalog_pages({image.product.category_id}, {image.product.slug})
+    return image.status
+
+
+def reclaim_stale_images():
+    """Return images whose processing outlived the lease to pending. Returns their number."""
+    # No claim time: claimed before processing_started_at was recorded
+    return ProductImage.objects.filter(
+        Q(processing_started_at__lt=timezone.now() - PROCESSING_LEASE) | Q(processing_started_at__isnull=True),
+        status=ProductImage.STATUS_PROCESSING,
+    ).update(status=ProductImage.STATUS_PENDING)
+
+
+def _process_in_background(pk):
+    close_old_connections()
+    try:
+        process_image(pk)
+    except Exception:
+        logger.exception('Processing product image %s failed', pk)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(pks):
+    """Process the given images on the worker pool once the transaction commits"""
+    pks = list(pks)
+    if not pks:
+        return
+
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS:
+            for pk in pks:
+                _get_executor().submit(_process_in_background, pk)
+        else:
+            for pk in pks:
+                process_image(pk)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,178 @@
+"""
+Precomputed related-product recommendations
+
+Each active product is described by its name, tagline, brand, category,
+descriptions, features, variants and fragrances. The descriptions are
+turned into TF-IDF vectors and the most cosine-similar products are stored
+in ProductRecommendation, which the product page reads by primary key.
+
+A rebuild recomputes every vector (the catalog is small and IDF weights
+are global) but only rewrites, and purges the cached pages of, products
+whose neighbours changed. Catalog saves that change any of the
+``INDEXED_FIELDS`` queue a rebuild on a background thread;
+``build_recommendations`` runs one on demand.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+from django.db import close_old_connections, connection, transaction
+
+from cms.page_cache import purge_groups
+from .models import Category, FragranceOption, Product, ProductRecommendation, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+RELATED_PRODUCTS = 4
+
+_WORD = re.compile(r'[^\W\d_]{2,}')
+
+STOPWORDS = frozenset(
+    'an and are as at be by for from has have in is it its of on or our that the this to '
+    'was were will with you your we us all any can per also more most'.split()
+)
+
+
+# The columns product_document() reads, and whether a product is included
+INDEXED_FIELDS = {
+    Product: (
+        'name', 'tagline', 'brand_name', 'category_id', 'short_description', 'full_description',
+        'features', 'is_active',
+    ),
+    Category: ('name',),
+    ProductVariant: ('product_id', 'variant_name', 'description', 'specifications'),
+    FragranceOption: ('product_id', 'name', 'category', 'description'),
+}
+
+
+def product_document(product):
+    """Text describing a product; the name and tagline count twice"""
+    parts = [
+        product.name, product.name, product.tagline, product.tagline,
+        product.brand_name, product.category.name,
+        product.short_description, product.full_description, product.features,
+    ]
+    for variant in product.variants.all():
+        parts += [variant.variant_name, variant.description, variant.specifications]
+    for fragrance in product.fragrances.all():
+        parts += [fragrance.name, fragrance.category, fragrance.description]
+    return ' '.join(part for part in parts if part)
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def tfidf_vectors(documents):
+    """L2-normalized TF-IDF vectors ({term: weight}) for token lists"""
+    df = Counter()
+    for tokens in documents:
+        df.update(set(tokens))
+    n = len(documents)
+    idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+
+    vectors = []
+    for tokens in documents:
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in Counter(tokens).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({term: w / norm for term, w in weights.items()})
+    return vectors
+
+
+def similarity_matrix(vectors):
+    """Cosine similarity of every pair of normalized vectors"""
+    vocabulary = {term: i for i, term in enumerate({t for vector in vectors for t in vector})}
+    matrix = numpy.zeros((len(vectors), len(vocabulary)), dtype=numpy.float32)
+    for row, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            matrix[row, vocabulary[term]] = weight
+    return (matrix @ matrix.T).tolist()
+
+
+def rebuild_recommendations():
+    """
+    Recompute the related products of every active product.
+    Returns the number of products whose recommendations changed.
+    """
+    products = list(
+        Product.objects.filter(is_active=True)
+        .select_related('category')
+        .prefetch_related('variants', 'fragrances')
+        .order_by('pk')
+    )
+    vectors = tfidf_vectors([tokenize(product_document(product)) for product in products])
+    scores = similarity_matrix(vectors)
+
+    existing = dict(ProductRecommendation.objects.values_list('product_id', 'related_ids'))
+    changed = []
+    for i, product in enumerate(products):
+        ranked = sorted(
+            (j for j in range(len(products)) if j != i and scores[i][j] > 0),
+            key=lambda j: (-scores[i][j], -products[j].pk)
+        )
+        related_ids = [products[j].pk for j in ranked[:RELATED_PRODUCTS]]
+        if existing.get(product.pk) != related_ids:
+            changed.append(ProductRecommendation(product=product, related_ids=related_ids))
+
+    with transaction.atomic():
+        ProductRecommendation.objects.exclude(product_id__in=[p.pk for p in products]).delete()
+        ProductRecommendation.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['related_ids', 'built_at']
+        )
+        if changed:
+            slugs = [f'product:{r.product.slug}' for r in changed]
+            transaction.on_commit(lambda: purge_groups(*slugs))
+    return len(changed)
+
+
+def related_products(product):
+    """Recommended products for a product page, most similar first"""
+    related_ids = ProductRecommendation.objects.filter(pk=product.pk).values_list('related_ids', flat=True).first()
+    if related_ids is None:
+        # Not built yet: newest products from the same category
+        return list(
+            Product.objects.filter(category=product.category, is_active=True)
+            .select_related('primary_image').exclude(id=product.id)[:RELATED_PRODUCTS]
+        )
+
+    found = Product.objects.filter(is_active=True).select_related('primary_image').in_bulk(related_ids)
+    return [found[pk] for pk in related_ids if pk in found]
+
+
+# Background rebuilds: one thread, and at most one rebuild waiting
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recommendations')
+_lock = threading.Lock()
+_queued = False
+
+
+def _rebuild_in_background():
+    global _queued
+    with _lock:
+        _queued = False
+    close_old_connections()
+    try:
+        rebuild_recommendations()
+    except Exception:
+        logger.exception('Rebuilding product recommendations failed')
+    finally:
+        connection.close()
+
+
+def schedule_rebuild():
+    """Rebuild the recommendations in the background after the transaction commits"""
+    def submit():
+        global _queued
+        with _lock:
+            if _queued:
+                return
+            _queued = True
+        _executor.submit(_rebuild_in_background)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,210 @@
+"""
+Full-text product search
+
+Products are indexed in an SQLite FTS5 table (created by migration 0004)
+covering the name, tagline, brand, category name, descriptions and
+features. Rows are kept in sync by the signals in products.signals and can
+be rebuilt with the ``rebuild_search_index`` command. Searches are ranked
+with BM25 and return highlighted snippets.
+
+Queries are normalized (case, accents, word order, plural endings) and the
+ordered hits of each normalized query are kept in the shared cache, keyed
+by the catalog version, so repeated searches skip SQLite and any catalog
+edit makes them fresh again.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils.html import escape
+
+from .catalog import catalog_version
+from .models import Category, Product
+
+
+FTS_TABLE = 'products_product_fts'
+
+# Indexed columns and their BM25 weights
+COLUMNS = (
+    ('name', 10.0),
+    ('tagline', 4.0),
+    ('brand_name', 6.0),
+    ('category_name', 3.0),
+    ('short_description', 2.0),
+    ('features', 2.0),
+    ('full_description', 1.0),
+)
+
+# Snippet markers; control characters never occur in indexed text
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+_WORD = re.compile(r'\w+')
+
+# Hits cached per normalized query; later pages are read from the database
+CACHED_HITS = 240
+SEARCH_CACHE_TIMEOUT = 60 * 60
+
+Hit = namedtuple('Hit', ['id', 'rank', 'snippet'])
+
+
+def _source_sql(where):
+    product, category = Product._meta.db_table, Category._meta.db_table
+    return (
+        f'SELECT p.id, p.name, p.tagline, p.brand_name, c.name, p.short_description, p.features, p.full_description '
+        f'FROM {product} p JOIN {category} c ON c.id = p.category_id WHERE {where}'
+    )
+
+
+def _reindex(where, params):
+    columns = ', '.join(name for name, weight in COLUMNS)
+    product = Product._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT p.id FROM {product} p WHERE {where})', params)
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, {columns}) {_source_sql(where)}', params)
+
+
+def index_products(product_ids):
+    """(Re)index the given products"""
+    ids = list(product_ids)
+    if ids:
+        _reindex(f'p.id IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def index_category(category_id):
+    """Reindex every product of a category, e.g. after it is renamed"""
+    _reindex('p.category_id = %s', [category_id])
+
+
+def remove_product(product_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def rebuild_index():
+    """Rebuild the whole index from the product table"""
+    weights = ', '.join(str(weight) for name, weight in COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', %s)", [f'bm25({weights})'])
+    _reindex('1 = 1', [])
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def _stem(word):
+    """
+    Strip plural endings. The index's porter stemmer treats the remaining
+    prefix the same way, so e.g. "papers" and "paper" find the same products.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'i'
+    if len(word) > 4 and word.endswith(('sses', 'xes', 'ches', 'shes', 'zes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query):
+    """The words of a query, lower-cased, without accents, stemmed and sorted"""
+    text = ''.join(c for c in unicodedata.normalize('NFKD', query) if not unicodedata.combining(c))
+    return sorted({_stem(word) for word in _WORD.findall(text.casefold())})
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    Returns None when the text has no searchable words.
+    """
+    words = normalize_query(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _cache_key(kind, expression, category_slug=''):
+    digest = hashlib.md5(f'{expression}|{category_slug}'.encode('utf-8')).hexdigest()
+    return f'products:search:{kind}:{catalog_version()}:{digest}'
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _query_hits(expression, category_slug, after, limit):
+    product, category = Product._meta.db_table, Category._meta.db_table
+    conditions = [f'{FTS_TABLE} MATCH %s', 'p.is_active']
+    params = [MARK_START, MARK_END, expression]
+    if category_slug:
+        conditions.append('c.slug = %s')
+        params.append(category_slug)
+    if after:
+        rank, pk = after
+        conditions.append(f'({FTS_TABLE}.rank > %s OR ({FTS_TABLE}.rank = %s AND {FTS_TABLE}.rowid > %s))')
+        params += [rank, rank, pk]
+    params.append(limit)
+
+    sql = (
+        f"SELECT {FTS_TABLE}.rowid, {FTS_TABLE}.rank, snippet({FTS_TABLE}, -1, %s, %s, '…', 16) "
+        f'FROM {FTS_TABLE} '
+        f'JOIN {product} p ON p.id = {FTS_TABLE}.rowid '
+        f'JOIN {category} c ON c.id = p.category_id '
+        f'WHERE {" AND ".join(conditions)} '
+        f'ORDER BY {FTS_TABLE}.rank, {FTS_TABLE}.rowid LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [Hit(pk, rank, _highlight(snippet)) for pk, rank, snippet in cursor.fetchall()]
+
+
+def search(query, category_slug=None, after=None, limit=20):
+    """
+    Active products matching ``query``, best match first.
+    ``after`` is the ``(rank, id)`` of the last hit of the previous page.
+    Returns Hit tuples with HTML-safe highlighted snippets.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    key = _cache_key('hits', expression, category_slug or '')
+    hits = cache.get(key)
+    if hits is None:
+        hits = _query_hits(expression, category_slug, None, CACHED_HITS)
+        cache.set(key, hits, SEARCH_CACHE_TIMEOUT)
+
+    truncated = len(hits) == CACHED_HITS
+    if after:
+        hits = [hit for hit in hits if (hit.rank, hit.id) > tuple(after)]
+    if len(hits) < limit and truncated:
+        # Paging past the cached hits
+        return _query_hits(expression, category_slug, after, limit)
+    return hits[:limit]
+
+
+def category_counts(query):
+    """Number of active products matching ``query`` in each category: ``{category_id: count}``"""
+    expression = match_expression(query)
+    if expression is None:
+        return {}
+
+    key = _cache_key('categories', expression)
+    counts = cache.get(key)
+    if counts is None:
+        # Only the matching rows are grouped, never the whole product table
+        product = Product._meta.db_table
+        sql = (
+            f'SELECT p.category_id, COUNT(*) FROM {FTS_TABLE} '
+            f'JOIN {product} p ON p.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND p.is_active '
+            f'GROUP BY p.category_id'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression])
+            counts = dict(cursor.fetchall())
+        cache.set(key, counts, SEARCH_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,158 @@
+"""
+Signal handlers for the products app
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from cms.page_cache import purge_groups
+from .models import Category, Product, ProductImage, ProductVariant, FragranceOption
+from .catalog import bump_catalog_version
+from .images import delete_derivatives
+from .processing import schedule_image_processing
+from .recommendations import INDEXED_FIELDS, schedule_rebuild
+from . import search
+
+
+def purge_catalog_pages(category_ids, slugs=()):
+    """
+    Purge the product list and the detail pages affected by a catalog change:
+    the given products plus every product in the given categories, whose
+    pages show the category and its products as related items.
+    """
+    bump_catalog_version()
+
+    def purge():
+        category_slugs = Product.objects.filter(
+            category_id__in=category_ids
+        ).values_list('slug', flat=True)
+        purge_groups('products', *{f'product:{slug}' for slug in [*slugs, *category_slugs]})
+
+    transaction.on_commit(purge)
+
+
+def remember_previous_product(sender, instance, **kwargs):
+    """Keep the slug, category and status a product had before this save"""
+    instance._previous = None
+    if instance.pk:
+        instance._previous = Product.objects.filter(pk=instance.pk).values('slug', 'category_id', 'is_active').first()
+
+
+def product_changed(sender, instance, **kwargs):
+    category_ids = {instance.category_id}
+    slugs = {instance.slug}
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        category_ids.add(previous['category_id'])
+        slugs.add(previous['slug'])
+    purge_catalog_pages(category_ids, slugs)
+
+
+def _count_product(category_id, is_active, delta):
+    Category.objects.filter(pk=category_id).update(
+        product_count=F('product_count') + delta,
+        **({'active_product_count': F('active_product_count') + delta} if is_active else {})
+    )
+
+
+def count_saved_product(sender, instance, **kwargs):
+    """Move the product between the category counters if its category or status changed"""
+    previous = getattr(instance, '_previous', None)
+    if previous and (previous['category_id'], previous['is_active']) == (instance.category_id, instance.is_active):
+        return
+    with transaction.atomic():
+        if previous:
+            _count_product(previous['category_id'], previous['is_active'], -1)
+        _count_product(instance.category_id, instance.is_active, 1)
+
+
+def count_deleted_product(sender, instance, **kwargs):
+    _count_product(instance.category_id, instance.is_active, -1)
+
+
+def category_changed(sender, instance, **kwargs):
+    purge_catalog_pages({instance.pk})
+
+
+def product_image_changed(sender, instance, **kwargs):
+    # Images appear on the list, the product page and related-product cards
+    purge_catalog_pages({instance.product.category_id}, {instance.product.slug})
+
+
+def product_image_saved(sender, instance, **kwargs):
+    if getattr(instance, 'needs_processing', False):
+        schedule_image_processing([instance.pk])
+
+
+def product_image_deleted(sender, instance, **kwargs):
+    # The deleted image may have been the product's primary image
+    product = Product.objects.filter(pk=instance.product_id).first()
+    if product is not None:
+        product.update_primary_image()
+    # django-cleanup removes the original file; the derivatives go with it
+    derivatives = instance.derivatives
+    transaction.on_commit(lambda: delete_derivatives(derivatives))
+
+
+def product_option_changed(sender, instance, **kwargs):
+    # Variants and fragrances only appear on the product's own page, and
+    # fragrance names in the search suggestions
+    bump_catalog_version()
+    slug = instance.product.slug
+    transaction.on_commit(lambda: purge_groups(f'product:{slug}'))
+
+
+def index_product(sender, instance, **kwargs):
+    search.index_products([instance.pk])
+
+
+def unindex_product(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+def index_category(sender, instance, **kwargs):
+    # The category name is indexed with each of its products
+    search.index_category(instance.pk)
+
+
+def remember_indexed_text(sender, instance, update_fields=None, **kwargs):
+    """Keep the recommendation inputs a row had before this save"""
+    fields = INDEXED_FIELDS[sender]
+    instance._indexed = None
+    if update_fields is not None and not {sender._meta.get_field(name).name for name in fields} & set(update_fields):
+        instance._indexed = {name: getattr(instance, name) for name in fields}
+    elif instance.pk:
+        instance._indexed = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def catalog_text_saved(sender, instance, **kwargs):
+    # Product text feeds the related-product recommendations
+    previous = getattr(instance, '_indexed', None)
+    if previous != {name: getattr(instance, name) for name in INDEXED_FIELDS[sender]}:
+        schedule_rebuild()
+
+
+def catalog_text_deleted(sender, **kwargs):
+    schedule_rebuild()
+
+
+def connect_signals():
+    pre_save.connect(remember_previous_product, sender=Product, dispatch_uid='page-cache-product-pre')
+    for name, signal in (('save', post_save), ('delete', post_delete)):
+        signal.connect(product_changed, sender=Product, dispatch_uid=f'page-cache-product-{name}')
+        signal.connect(category_changed, sender=Category, dispatch_uid=f'page-cache-category-{name}')
+        signal.connect(product_image_changed, sender=ProductImage, dispatch_uid=f'page-cache-image-{name}')
+        for model in (ProductVariant, FragranceOption):
+            signal.connect(product_option_changed, sender=model, dispatch_uid=f'page-cache-{model.__name__}-{name}')
+
+    post_save.connect(count_saved_product, sender=Product, dispatch_uid='category-counts-product-save')
+    post_delete.connect(count_deleted_product, sender=Product, dispatch_uid='category-counts-product-delete')
+    post_save.connect(index_product, sender=Product, dispatch_uid='search-index-product-save')
+    post_delete.connect(unindex_product, sender=Product, dispatch_uid='search-index-product-delete')
+    post_save.connect(product_image_saved, sender=ProductImage, dispatch_uid='image-processing-save')
+    post_delete.connect(product_image_deleted, sender=ProductImage, dispatch_uid='primary-image-delete')
+    post_save.connect(index_category, sender=Category, dispatch_uid='search-index-category-save')
+    for model in INDEXED_FIELDS:
+        pre_save.connect(remember_indexed_text, sender=model, dispatch_uid=f'recommendations-{model.__name__}-pre')
+        post_save.connect(catalog_text_saved, sender=model, dispatch_uid=f'recommendations-{model.__name__}-save')
+        post_delete.connect(catalog_text_deleted, sender=model, dispatch_uid=f'recommendations-{model.__name__}-delete')
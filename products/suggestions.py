@@ -0,0 +1,125 @@
+"""
+Search-as-you-type suggestions
+
+Each worker keeps a sorted list of the active catalog's product names,
+brands, category names and fragrance names, keyed by every word-start of
+the normalized text so "lav" finds "Fresh Lavender" as well as "Lavender
+Fresh". A prefix lookup is two bisections over that list; the database is
+only read when the index is rebuilt, which happens when the catalog version
+(see products.catalog) has changed.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+from .catalog import catalog_version
+from .models import Category, FragranceOption, Product
+
+
+# Seconds between checks of the shared catalog version
+VERSION_CHECK_INTERVAL = 1.0
+
+MAX_SUGGESTIONS = 8
+
+# Kinds in the order their suggestions are listed
+KINDS = ('product', 'brand', 'category', 'fragrance')
+
+Suggestion = namedtuple('Suggestion', ['label', 'kind', 'url', 'detail'])
+
+
+def normalize(text):
+    """Case- and accent-insensitive form of ``text`` with single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def _entries(suggestion):
+    """Index keys of a suggestion: its text from the start of every word"""
+    words = normalize(suggestion.label).split(' ')
+    for i in range(len(words)):
+        yield (' '.join(words[i:]), i > 0, KINDS.index(suggestion.kind), suggestion)
+
+
+def _catalog_suggestions():
+    products = Product.objects.filter(is_active=True, category__is_active=True).select_related('category')
+    brands = set()
+    for product in products.only('name', 'slug', 'brand_name', 'category__name'):
+        yield Suggestion(product.name, 'product', product.get_absolute_url(), product.category.name)
+        if product.brand_name and product.brand_name.casefold() not in brands:
+            brands.add(product.brand_name.casefold())
+            url = f"{reverse('products:list')}?{urlencode({'q': product.brand_name})}"
+            yield Suggestion(product.brand_name, 'brand', url, '')
+
+    for category in Category.objects.filter(is_active=True, active_product_count__gt=0):
+        url = f"{reverse('products:list')}?{urlencode({'category': category.slug})}"
+        yield Suggestion(category.name, 'category', url, '')
+
+    fragrances = FragranceOption.objects.filter(
+        product__is_active=True, product__category__is_active=True
+    ).select_related('product').only('name', 'product__name', 'product__slug')
+    for fragrance in fragrances:
+        yield Suggestion(fragrance.name, 'fragrance', fragrance.product.get_absolute_url(), fragrance.product.name)
+
+
+class SuggestionIndex:
+    """Sorted (key, ...) entries of one catalog version"""
+
+    def __init__(self, suggestions, version=None):
+        self.version = version
+        self.entries = sorted(
+            (entry for suggestion in suggestions for entry in _entries(suggestion)),
+            key=lambda entry: entry[:3]
+        )
+        self.keys = [entry[0] for entry in self.entries]
+
+    def lookup(self, prefix, limit=MAX_SUGGESTIONS):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        # Keys starting with the prefix sort between prefix and prefix + U+10FFFF
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        # Matches at the start of the text first, then by kind and length
+        matches = sorted(self.entries[start:end], key=lambda entry: (entry[1], entry[2], len(entry[0]), entry[0]))
+
+        seen = set()
+        results = []
+        for key, mid_word, kind, suggestion in matches:
+            if (suggestion.kind, suggestion.url, suggestion.label) in seen:
+                continue
+            seen.add((suggestion.kind, suggestion.url, suggestion.label))
+            results.append(suggestion)
+            if len(results) == limit:
+                break
+        return results
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """This worker's index, rebuilt if the catalog changed since it was built"""
+    global _index, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        version = catalog_version()
+        if _index is None or _index.version != version:
+            _index = SuggestionIndex(_catalog_suggestions(), version)
+        _checked_at = now
+    return _index
+
+
+def suggest(prefix, limit=MAX_SUGGESTIONS):
+    return get_index().lookup(prefix, limit)
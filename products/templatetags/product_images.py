@@ -0,0 +1,41 @@
+"""
+Template tags for responsive product images
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(files):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(files.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def product_picture(image, sizes='100vw', **attrs):
+    """
+    Render a ProductImage as a <picture> with WebP and JPEG srcsets.
+    Extra keyword arguments become <img> attributes.
+    Usage: {% product_picture product.get_primary_image sizes="33vw" alt=product.name loading="lazy" %}
+    """
+    if not image:
+        return ''
+
+    derivatives = image.derivatives or {}
+    if derivatives.get('source') != image.image.name or not derivatives.get('jpeg'):
+        # Not processed (yet): serve the original upload
+        return format_html('<img src="{}"{}>', image.image.url, flatatt(attrs))
+
+    jpeg = derivatives['jpeg']
+    largest = max(jpeg, key=int)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(derivatives['webp']), sizes,
+        default_storage.url(jpeg[largest]), _srcset(jpeg), sizes, flatatt(attrs)
+    )
@@ -1,3 +1,115 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Product, ProductImage
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProductListQueryTests(TestCase):
+    """The listing's query count must not grow with the number of product cards"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Tissues')
+        cls.user = User.objects.create_user('visitor')
+
+    def setUp(self):
+        # Signed-in users bypass the page cache, so every request renders
+        self.client.force_login(self.user)
+
+    def add_product(self, n):
+        product = Product.objects.create(category=self.category, name=f'Product {n}')
+        name = f'products/product-{n}.jpg'
+        ProductImage.objects.create(
+            product=product, image=name, is_primary=True,
+            derivatives={
+                'source': name,
+                'jpeg': {'400': f'products/derivatives/product-{n}-400.jpg'},
+                'webp': {'400': f'products/derivatives/product-{n}-400.webp'},
+            },
+        )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('products:list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_cards_add_no_queries(self):
+        self.add_product(1)
+        self.count_queries()  # Warm the per-process site settings caches
+        one_card = self.count_queries()
+        self.add_product(2)
+        self.add_product(3)
+        self.assertEqual(self.count_queries(), one_card)
+
+
+class CategoryCounterTests(TestCase):
+    def test_save_keeps_counters_updated_since_load(self):
+        category = Category.objects.create(name='Tissues')
+        Product.objects.create(category=category, name='Napkins')
+        category.description = 'Soft tissues'
+        category.save()
+
+        category.refresh_from_db()
+        self.assertEqual(category.description, 'Soft tissues')
+        self.assertEqual((category.product_count, category.active_product_count), (1, 1))
+
+
+class ProductImageSaveTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Tissues')
+        self.product = Product.objects.create(category=category, name='Napkins')
+
+    def test_save_keeps_processing_state_written_since_load(self):
+        image = ProductImage.objects.create(product=self.product, image='products/napkins.jpg')
+        derivatives = {'source': 'products/napkins.jpg', 'jpeg': {'400': 'products/derivatives/napkins-400.jpg'}}
+        # The worker finishes while the form still holds the pending object
+        ProductImage.objects.filter(pk=image.pk).update(derivatives=derivatives, status=ProductImage.STATUS_READY)
+
+        image.alt_text = 'Folded napkins'
+        with mock.patch('products.signals.schedule_image_processing') as schedule:
+            image.save()
+        schedule.assert_not_called()
+
+        image.refresh_from_db()
+        self.assertEqual(image.alt_text, 'Folded napkins')
+        self.assertEqual(image.status, ProductImage.STATUS_READY)
+        self.assertEqual(image.derivatives, derivatives)
+
+    def test_replaced_file_is_processed_again(self):
+        image = ProductImage.objects.create(product=self.product, image='products/napkins.jpg')
+        ProductImage.objects.filter(pk=image.pk).update(status=ProductImage.STATUS_READY)
+
+        image.image = 'products/napkins-2.jpg'
+        with mock.patch('products.signals.schedule_image_processing') as schedule:
+            image.save()
+        schedule.assert_called_once_with([image.pk])
+        image.refresh_from_db()
+        self.assertEqual(image.status, ProductImage.STATUS_PENDING)
+
+
+class RecommendationRebuildTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Tissues')
+        self.product = Product.objects.create(category=self.category, name='Napkins')
+
+    def save(self, obj, **kwargs):
+        with mock.patch('products.signals.schedule_rebuild') as schedule:
+            obj.save(**kwargs)
+        return schedule.called
+
+    def test_rebuild_only_when_indexed_text_changes(self):
+        self.product.is_featured = True
+        self.assertFalse(self.save(self.product))
+        self.assertFalse(self.save(self.product, update_fields=['is_featured']))
+
+        self.product.tagline = 'Soft and strong'
+        self.assertTrue(self.save(self.product))
+        self.category.name = 'Paper tissues'
+        self.assertTrue(self.save(self.category))
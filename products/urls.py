@@ -5,5 +5,7 @@ app_name = 'products'
 
 urlpatterns = [
     path('', views.product_list, name='list'),
+    path('api/list/', views.product_list_json, name='list_json'),
+    path('api/suggest/', views.product_suggestions, name='suggest'),
     path('<slug:slug>/', views.product_detail, name='detail'),
 ]
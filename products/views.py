@@ -1,53 +1,192 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from urllib.parse import urlencode
+
 from django.shortcuts import render, get_object_or_404
 from django.db.models import Q
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from cms.page_cache import cache_public_page
 from .models import Product, Category
+from . import recommendations, search, suggestions
 
 
-def product_list(request):
-    """Product listing page with filters"""
-    # Always load ALL products for client-side filtering
-    all_products = Product.objects.filter(is_active=True).select_related('category').prefetch_related('images')
+PRODUCTS_PER_PAGE = 12
 
-    # Get category slug from URL (for initial state, not for filtering)
-    category_slug = request.GET.get('category')
+# Columns shown on a product card; long descriptions and SEO fields are left out
+CARD_FIELDS = (
+    'id', 'name', 'slug', 'tagline', 'short_description', 'features',
+    'minimum_order_quantity', 'is_featured', 'is_coming_soon', 'created_at',
+    'category__name', 'category__slug', 'primary_image__image', 'primary_image__derivatives',
+)
+
+LIST_PARAMS = ('category', 'q', 'after')
+
+
+def _encode_cursor(values):
+    raw = json.dumps(values)
+    return urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(token):
+    """Return the cursor's list of values, or None for a missing or bad token"""
+    if not token:
+        return None
+    try:
+        values = json.loads(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _listing_page(products, cursor):
+    """Keyset page in listing order (featured first, then newest)"""
+    try:
+        is_featured, created_at, pk = cursor or ()
+        products = products.filter(
+            Q(is_featured__lt=bool(is_featured)) |
+            Q(is_featured=bool(is_featured), created_at__lt=datetime.fromisoformat(created_at)) |
+            Q(is_featured=bool(is_featured), created_at=datetime.fromisoformat(created_at), id__lt=int(pk))
+        )
+    except (ValueError, TypeError):
+        pass  # First page
+
+    page = list(products.order_by('-is_featured', '-created_at', '-id')[:PRODUCTS_PER_PAGE + 1])
+    last = page[min(len(page), PRODUCTS_PER_PAGE) - 1] if page else None
+    return page, last and [last.is_featured, last.created_at.isoformat(), last.pk]
+
+
+def _search_page(products, search_query, category_slug, cursor):
+    """Full-text page in BM25 order, with highlighted snippets"""
+    try:
+        rank, pk = cursor or ()
+        after = (float(rank), int(pk))
+    except (ValueError, TypeError):
+        after = None
+
+    hits = search.search(search_query, category_slug, after=after, limit=PRODUCTS_PER_PAGE + 1)
+    found = products.in_bulk([hit.id for hit in hits])
+    page = []
+    for hit in hits:
+        product = found.get(hit.id)
+        if product is not None:
+            product.search_snippet = hit.snippet
+            page.append(product)
+
+    last = hits[min(len(hits), PRODUCTS_PER_PAGE) - 1] if hits else None
+    return page, last and [last.rank, last.id]
 
-    # Search filter (still server-side for search functionality)
+
+def _catalog_page(request):
+    """
+    One page of the filtered catalog, continuing after the ``after`` cursor.
+    Searches are ranked by relevance, everything else is in listing order.
+    Returns the products and the query string of the next page, if any.
+    """
+    products = Product.objects.filter(is_active=True).select_related('category', 'primary_image').only(*CARD_FIELDS)
+    cursor = _decode_cursor(request.GET.get('after'))
+
+    category_slug = request.GET.get('category')
     search_query = request.GET.get('q')
     if search_query:
-        all_products = all_products.filter(
-            Q(name__icontains=search_query) |
-            Q(short_description__icontains=search_query) |
-            Q(full_description__icontains=search_query)
-        )
+        page, last = _search_page(products, search_query, category_slug, cursor)
+    else:
+        if category_slug:
+            products = products.filter(category__slug=category_slug)
+        page, last = _listing_page(products, cursor)
+
+    next_query = None
+    if len(page) > PRODUCTS_PER_PAGE:
+        page = page[:PRODUCTS_PER_PAGE]
+        params = {name: request.GET[name] for name in ('category', 'q') if request.GET.get(name)}
+        params['after'] = _encode_cursor(last)
+        next_query = urlencode(params)
+    return page, next_query
 
-    # Get all categories for filter buttons
-    categories = Category.objects.all()
+
+@cache_public_page('products', params=LIST_PARAMS)
+def product_list(request):
+    """Product listing page with filters"""
+    products, next_query = _catalog_page(request)
+
+    # Category filter buttons, with the number of products each would show
+    categories = list(Category.objects.all())
+    search_query = request.GET.get('q')
+    if search_query:
+        counts = search.category_counts(search_query)
+        for category in categories:
+            category.facet_count = counts.get(category.pk, 0)
+    else:
+        for category in categories:
+            category.facet_count = category.active_product_count
+    category_slug = request.GET.get('category')
+    current_category = next((c for c in categories if c.slug == category_slug), None)
 
     context = {
-        'products': all_products,  # Always send ALL products to template
+        'products': products,
+        'next_query': next_query,
         'categories': categories,
-        'current_category': category_slug,  # Only for setting initial button state
+        'total_count': sum(category.facet_count for category in categories),
+        'current_category': current_category,
+        'category_slug': category_slug,
         'search_query': search_query,
     }
     return render(request, 'products/product_list.html', context)
 
 
+@cache_public_page('products', params=LIST_PARAMS)
+def product_list_json(request):
+    """Next page of the product listing, for incremental loading"""
+    products, next_query = _catalog_page(request)
+    html = render_to_string('products/includes/product_cards.html', {'products': products}, request=request)
+    return JsonResponse({
+        'results': [
+            {
+                'name': product.name,
+                'slug': product.slug,
+                'url': product.get_absolute_url(),
+                'category': product.category.slug,
+                'tagline': product.tagline,
+                'is_featured': product.is_featured,
+                'is_coming_soon': product.is_coming_soon,
+                'snippet': getattr(product, 'search_snippet', None),
+            }
+            for product in products
+        ],
+        'html': html,
+        'next': next_query,
+    })
+
+
+@cache_public_page('product:{slug}')
 def product_detail(request, slug):
     """Product detail page"""
     product = get_object_or_404(
-        Product.objects.prefetch_related('images', 'variants', 'fragrances'),
+        Product.objects.select_related('category', 'primary_image').prefetch_related('images', 'variants', 'fragrances'),
         slug=slug,
         is_active=True
     )
 
-    # Get related products from same category
-    related_products = Product.objects.filter(
-        category=product.category,
-        is_active=True
-    ).exclude(id=product.id)[:4]
+    # Precomputed from content similarity, see products.recommendations
+    related_products = recommendations.related_products(product)
 
     context = {
         'product': product,
         'related_products': related_products,
     }
     return render(request, 'products/product_detail.html', context)
+
+
+def product_suggestions(request):
+    """Search-as-you-type suggestions for the catalog search box"""
+    query = request.GET.get('q', '')[:100]
+    response = JsonResponse({
+        'suggestions': [
+            {'label': s.label, 'type': s.kind, 'url': s.url, 'detail': s.detail}
+            for s in suggestions.suggest(query)
+        ]
+    })
+    patch_cache_control(response, public=True, max_age=60)
+    return response